@@ -1,10 +1,25 @@
 import streamlit as st
 import streamlit.components.v1 as components
+from streamlit.logger import get_logger
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 import plotly.graph_objects as go
 import plotly.express as px
 import pandas as pd
+import numpy as np
 import base64
+import hashlib
 import json
+import os
+import sys
+import threading
+import time
+from typing import NamedTuple, Optional
+
+from esquema import (
+    COLUMNAS, FRECUENCIA_ANUAL, FRECUENCIA_MENSUAL, FRECUENCIA_TRIMESTRAL,
+    VERSION_ESQUEMA, etiqueta_mensual, numeros_mensuales, numeros_trimestrales,
+    sha256_archivo, tipar_largo,
+)
 
 
 # ─────────────────────────────────────────────
@@ -61,6 +76,7 @@ st.markdown("""
 # Constantes
 # ─────────────────────────────────────────────
 VS_CODE_PATH      = "data/base_provincias_dashboard.xlsx"
+SNAPSHOT_DIR      = "data/snapshot"
 SHEET_ANUAL       = "anual"
 SHEET_TRIM        = "trim"
 SHEET_ART         = "art"
@@ -69,6 +85,11 @@ SHEET_VAB_RAMAS   = "vabporramas"
 SECTOR_INDUSTRIA  = "Industria manufacturera"
 LABEL_ART         = "Alícuota promedio ART"
 
+# Versiones de datos que conservan las cachés por versión: la vigente y la
+# anterior (sesiones abiertas durante una actualización). Las más viejas se
+# descartan en vez de quedar en memoria hasta reiniciar el servidor.
+VERSIONES_CACHE_MAX = 2
+
 # ✅ Los 3 ratios del mapa por indicadores (se calculan on-the-fly)
 MAPA_IND_RATIOS = {
     "ind_vab":   {"num": "vab_indus",   "den": "vab",  "label": "Industria / VAB total"},
@@ -97,23 +118,24 @@ PALETTE = [
     "#6C3483","#117A65","#784212","#1F618D","#922B21",
     "#0B5345","#6E2F8C","#1A5276","#7D6608","#4A235A",
 ]
-COLORES_SECT = ["#1B2D6B","#D4860A","#127070","#C0392B","#7B2D8B","#aab0c0"]
+# Mapa coroplético: alto fijo y encuadre de Argentina
+MAPA_ALTO_PX   = 700
+MAPA_LAT_RANGE = [-60, -22]
+MAPA_LON_RANGE = [-75, -52]
+
+# Mapa en el navegador (componentes/mapa_coropletas): la geometría se manda una vez por sesión
+MAPA_MODO_CLIENTE = True
+MAPA_COMPONENTE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                   "componentes", "mapa_coropletas")
+
+# Variantes simplificadas (scripts/simplificar_geojson.py): tolerancia en grados -> archivo
+GEO_VARIANTES = {
+    0.020: "data/provincias_ign_s020.geojson",
+    0.010: "data/provincias_ign_s010.geojson",
+    0.005: "data/provincias_ign_s005.geojson",
+}
 
-def _generar_periodos_art():
-    meses = ["ene","feb","mar","abr","may","jun","jul","ago","sep","oct","nov","dic"]
-    result = []
-    for yr in range(2020, 2026):
-        for i, m in enumerate(meses, 1):
-            label = f"{m}-{str(yr)[2:]}"
-            order = yr * 100 + i
-            result.append((label, order))
-    result = [(l, o) for l, o in result if o >= 202011 and o <= 202510]
-    return result
-
-PERIODOS_ART        = _generar_periodos_art()
-PERIODOS_ART_LABELS = [p[0] for p in PERIODOS_ART]
-PERIODOS_ART_ORDERS = [p[1] for p in PERIODOS_ART]
-N_PERIODOS_ART      = len(PERIODOS_ART_LABELS)
+COLORES_SECT = ["#1B2D6B","#D4860A","#127070","#C0392B","#7B2D8B","#aab0c0"]
 
 # ─────────────────────────────────────────────
 # Helpers generales
@@ -146,98 +168,192 @@ def img_to_base64(path):
 # ─────────────────────────────────────────────
 # Loaders
 # ─────────────────────────────────────────────
-@st.cache_data(show_spinner=False)
-def load_anual(file_path, sheet_name):
-    df = pd.read_excel(file_path, sheet_name=sheet_name, engine="openpyxl")
+class DatosTablero(NamedTuple):
+    anual:      pd.DataFrame
+    trim:       pd.DataFrame
+    art:        pd.DataFrame
+    vab_sector: pd.DataFrame
+    vab_ramas:  pd.DataFrame
+    errores:    dict   # hoja -> mensaje, para las hojas que no se pudieron cargar
+
+def _version_archivo(path):
+    """Clave de caché de los datos: cambia cuando se reescribe el Excel."""
+    try:
+        st_ = os.stat(path)
+    except OSError:
+        return None
+    return f"{st_.st_mtime_ns}-{st_.st_size}"
+
+def _snapshot_vigente(file_path):
+    """
+    True si existe el snapshot Parquet que escribe scripts/actualizar_datos.py,
+    su manifest corresponde al Excel actual (mismo hash) y fue escrito con la
+    versión de esquema.py que usa el dashboard.
+    """
+    manifest_path = os.path.join(SNAPSHOT_DIR, "manifest.json")
+    if not os.path.exists(manifest_path):
+        return False
+    try:
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("esquema") != VERSION_ESQUEMA:
+            return False
+        if os.path.exists(file_path) and manifest.get("sha256") != sha256_archivo(file_path):
+            return False
+    except Exception:
+        return False
+    return True
+
+def _leer_snapshot(sheet_name):
+    """Hoja en formato largo desde el snapshot, o None si falta o no se puede leer."""
+    parquet_path = os.path.join(SNAPSHOT_DIR, f"{sheet_name}.parquet")
+    if not os.path.exists(parquet_path):
+        return None
+    try:
+        return pd.read_parquet(parquet_path)
+    except Exception:
+        return None
+
+# Las tablas largas (anual / trim / art) salen con el esquema de esquema.py:
+# provincia, variable y period categóricas, period_num int32, value float32.
+def _anual_desde_excel(df):
     df.columns = [str(c).strip() for c in df.columns]
     col_prov, col_var = df.columns[0], df.columns[1]
     per_cols = df.columns[2:]
-    df[col_prov] = df[col_prov].astype(str).str.strip()
-    df[col_var]  = df[col_var].astype(str).str.strip()
     df_long = df.melt(id_vars=[col_prov,col_var], value_vars=per_cols,
                       var_name="period", value_name="value")
     df_long.columns = ["provincia","variable","period","value"]
     df_long["period_num"] = pd.to_numeric(df_long["period"], errors="coerce")
-    df_long["value"]      = pd.to_numeric(df_long["value"],  errors="coerce")
     df_long = df_long.dropna(subset=["period_num"])
-    df_long["period_num"] = df_long["period_num"].astype(int)
-    df_long = df_long[~df_long["provincia"].str.lower().isin(["nan","none",""])]
-    df_long = df_long[~df_long["variable"].str.lower().isin(["nan","none",""])]
-    return df_long
+    return tipar_largo(df_long, FRECUENCIA_ANUAL)
 
+def _anual_desde_snapshot(snap):
+    return snap[COLUMNAS]
 
-@st.cache_data(show_spinner=False)
-def load_trim(file_path, sheet_name):
-    df = pd.read_excel(file_path, sheet_name=sheet_name, engine="openpyxl")
+def _trim_desde_excel(df):
     df.columns = [str(c).strip() for c in df.columns]
     col_prov, col_var = df.columns[0], df.columns[1]
     per_cols = df.columns[2:]
-    df[col_prov] = df[col_prov].astype(str).str.strip()
-    df[col_var]  = df[col_var].astype(str).str.strip()
     df_long = df.melt(id_vars=[col_prov,col_var], value_vars=per_cols,
                       var_name="period", value_name="value")
     df_long.columns = ["provincia","variable","period","value"]
-    df_long["value"] = pd.to_numeric(df_long["value"], errors="coerce")
-    df_long = df_long[~df_long["provincia"].str.lower().isin(["nan","none",""])]
-    df_long = df_long[~df_long["variable"].str.lower().isin(["nan","none",""])]
-
-    def trim_order(s):
-        try:
-            p = str(s).split("-")
-            num = {"I":1,"II":2,"III":3,"IV":4}.get(p[0].strip(), 0)
-            yr  = int(p[1].strip())
-            yr  = yr+2000 if yr<50 else yr+1900
-            return yr*10 + num
-        except:
-            return 0
-
-    df_long["period_num"] = df_long["period"].apply(trim_order)
+    # Un número por etiqueta de columna (mismo parser que el ETL); melt
+    # apila columna por columna, así que se repite len(df) veces cada uno
+    df_long["period_num"] = np.repeat(numeros_trimestrales(per_cols), len(df))
     df_long = df_long[df_long["period_num"] > 0]
-    return df_long
+    return tipar_largo(df_long, FRECUENCIA_TRIMESTRAL)
 
+def _trim_desde_snapshot(snap):
+    snap = snap[COLUMNAS]
+    return snap[snap["period_num"] > 0].reset_index(drop=True)
+
+def _art_desde_excel(df, label=LABEL_ART):
+    """
+    Hoja ART: provincia en la columna A y un mes por columna desde la B.
+    Los meses salen del encabezado (fechas o etiquetas tipo "oct-25"), así
+    que las columnas nuevas entran solas. Se usan las columnas con mes
+    reconocible y al menos un dato (si un mes se repite, vale la primera),
+    ordenadas por período. Todo el bloque de valores se convierte de una
+    vez; las alícuotas expresadas como fracción (< 1) pasan a %.
+    """
+    nums = numeros_mensuales(df.iloc[0, 1:])
 
-@st.cache_data(show_spinner=False)
-def load_art(file_path, sheet_name, label):
-    df = pd.read_excel(file_path, sheet_name=sheet_name, engine="openpyxl", header=None)
     df_data = df.iloc[1:].copy().reset_index(drop=True)
     col_prov = 0
     df_data[col_prov] = df_data[col_prov].astype(str).str.strip()
     df_data = df_data[~df_data[col_prov].str.lower().isin(["nan","none",""])]
+    provs = df_data[col_prov].to_numpy()
+
+    celdas = pd.Series(df_data.iloc[:, 1:].to_numpy(dtype=object).ravel(), dtype=object)
+    texto  = (celdas.astype(str)
+                    .str.replace("%", "", regex=False)
+                    .str.replace(",", ".", regex=False)
+                    .str.strip())
+    vals = pd.to_numeric(texto, errors="coerce").to_numpy(dtype=float).reshape(len(provs), len(nums))
+    vals = np.where(vals < 1, vals * 100, vals)
+
+    validas = (nums > 0) & ~pd.Series(nums).duplicated().to_numpy() & ~np.isnan(vals).all(axis=0)
+    cols    = np.flatnonzero(validas)
+    cols    = cols[np.argsort(nums[cols], kind="stable")]
+    nums    = nums[cols]
+    vals    = vals[:, cols]
+
+    df_long = pd.DataFrame({
+        "provincia":  np.repeat(provs, len(cols)),
+        "variable":   label,
+        "period":     np.tile([etiqueta_mensual(n) for n in nums], len(provs)),
+        "period_num": np.tile(nums, len(provs)),
+        "value":      vals.ravel(),
+    })
+    return tipar_largo(df_long, FRECUENCIA_MENSUAL)
 
-    rows = []
-    for _, row in df_data.iterrows():
-        prov = row[col_prov]
-        for i, (period_label, period_num) in enumerate(PERIODOS_ART):
-            col_idx = i + 1
-            if col_idx >= len(row):
-                break
-            raw = row[col_idx]
-            try:
-                s = str(raw).replace("%","").replace(",",".").strip()
-                val = float(s)
-                if val < 1:
-                    val = val * 100
-            except:
-                val = float("nan")
-            rows.append({
-                "provincia":  prov,
-                "variable":   label,
-                "period":     period_label,
-                "period_num": period_num,
-                "value":      val,
-            })
-
-    return pd.DataFrame(rows)
-
-
-@st.cache_data(show_spinner=False)
-def load_vab_tabla(file_path, sheet_name):
-    df = pd.read_excel(file_path, sheet_name=sheet_name, engine="openpyxl")
+def _vab_desde_excel(df):
     df.columns = ["provincia","sector"] + list(df.columns[2:])
     df["provincia"] = df["provincia"].astype(str).str.strip()
     df["sector"]    = df["sector"].astype(str).str.strip()
     return df
 
+def _vab_desde_snapshot(snap):
+    # `fila` conserva el orden de la hoja original; los nombres ya vienen limpios
+    ids  = snap.drop_duplicates("fila").set_index("fila")[["provincia","variable"]].astype(str)
+    vals = snap.pivot(index="fila", columns="period_num", values="value")
+    df = ids.join(vals).reset_index(drop=True)
+    df.columns = ["provincia","sector"] + [int(c) for c in df.columns[2:]]
+    return df
+
+# hoja -> (parser desde Excel, parser desde snapshot, header de la hoja)
+_PARSERS_HOJAS = {
+    SHEET_ANUAL:      (_anual_desde_excel, _anual_desde_snapshot, 0),
+    SHEET_TRIM:       (_trim_desde_excel,  _trim_desde_snapshot,  0),
+    SHEET_ART:        (_art_desde_excel,   None,                  None),
+    SHEET_VAB_SECTOR: (_vab_desde_excel,   _vab_desde_snapshot,   0),
+    SHEET_VAB_RAMAS:  (_vab_desde_excel,   _vab_desde_snapshot,   0),
+}
+
+@st.cache_data(max_entries=VERSIONES_CACHE_MAX, show_spinner=False)
+def _load_hojas(file_path, version):
+    """
+    Carga todas las hojas del tablero en una sola pasada. Las que están en el
+    snapshot Parquet vigente salen de ahí; el resto se lee de un único
+    handle abierto del Excel. `version` sólo participa de la clave de caché.
+    Devuelve una tupla simple (picklable) con los campos de DatosTablero.
+    """
+    tablas, errores = {}, {}
+
+    pendientes = list(_PARSERS_HOJAS)
+    if _snapshot_vigente(file_path):
+        for sheet in list(pendientes):
+            parser_snap = _PARSERS_HOJAS[sheet][1]
+            snap = _leer_snapshot(sheet) if parser_snap else None
+            if snap is not None:
+                tablas[sheet] = parser_snap(snap)
+                pendientes.remove(sheet)
+
+    if pendientes:
+        try:
+            with pd.ExcelFile(file_path, engine="openpyxl") as xls:
+                for sheet in pendientes:
+                    parser_excel, _, header = _PARSERS_HOJAS[sheet]
+                    try:
+                        tablas[sheet] = parser_excel(xls.parse(sheet, header=header))
+                    except Exception as e:
+                        errores[sheet] = str(e)
+        except Exception as e:
+            for sheet in pendientes:
+                errores[sheet] = str(e)
+
+    return (
+        tablas.get(SHEET_ANUAL,      pd.DataFrame()),
+        tablas.get(SHEET_TRIM,       pd.DataFrame()),
+        tablas.get(SHEET_ART,        pd.DataFrame()),
+        tablas.get(SHEET_VAB_SECTOR, pd.DataFrame()),
+        tablas.get(SHEET_VAB_RAMAS,  pd.DataFrame()),
+        errores,
+    )
+
+def load_datos(file_path, version):
+    return DatosTablero(*_load_hojas(file_path, version))
+
 
 import unicodedata as _ud
 
@@ -251,11 +367,22 @@ _ALIAS_GEO = {
     "tierra del fuego":  "tierra del fuego, antartida e islas del atlantico sur",
 }
 
+def _ruta_geo_variante():
+    """
+    Variante más liviana que no se nota en el mapa: tolerancia menor a medio
+    píxel (grados de latitud por píxel al alto fijo del mapa).
+    """
+    grados_px = (MAPA_LAT_RANGE[1] - MAPA_LAT_RANGE[0]) / MAPA_ALTO_PX
+    for tol in sorted(GEO_VARIANTES, reverse=True):
+        if tol <= grados_px / 2 and os.path.exists(GEO_VARIANTES[tol]):
+            return GEO_VARIANTES[tol]
+    return None
+
 @st.cache_data(show_spinner=False)
 def load_argentina_geojson():
-    import os, urllib.request
-    for path in ["data/provincias_ign.geojson", "data/argentina.geojson", "provincias_ign.geojson"]:
-        if os.path.exists(path):
+    import urllib.request
+    for path in [_ruta_geo_variante(), "data/provincias_ign.geojson", "data/argentina.geojson", "provincias_ign.geojson"]:
+        if path and os.path.exists(path):
             with open(path, encoding="utf-8") as f:
                 return json.load(f)
     urls = [
@@ -274,33 +401,55 @@ def load_argentina_geojson():
             continue
     return None
 
+class CapaGeo(NamedTuple):
+    geojson:      dict
+    version:      str    # hash del GeoJSON: el navegador lo usa para saber si ya lo tiene
+    featureidkey: str
+    ids:          dict   # nombre normalizado de la feature -> id
+    por_provincia: dict  # provincia del tablero -> id (con _ALIAS_GEO aplicado)
+
+def _id_geo(capa, provincia):
+    if provincia in capa.por_provincia:
+        return capa.por_provincia[provincia]
+    n = _norm(provincia)
+    return capa.ids.get(_ALIAS_GEO.get(n, n))
+
+def _armar_capa_geo(geo, provincias):
+    features = geo.get("features", []) if geo else []
+    if not features:
+        return None
+    sample = features[0].get("properties", {})
+    feat_key = (
+        "properties.id" if "id" in sample else
+        "properties.nombre" if "nombre" in sample else
+        "properties.name"
+    )
+    ids = {}
+    for i, f in enumerate(features):
+        props = f.get("properties", {})
+        fid = props.get("id", props.get("ID", props.get("fid", props.get("FID", props.get("nombre", i)))))
+        nombre = props.get("nombre", props.get("name", props.get("NAME_1", "?")))
+        ids.setdefault(_norm(nombre), fid)
+    version = hashlib.sha1(json.dumps(geo, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+    capa = CapaGeo(geo, version, feat_key, ids, {})
+    for p in provincias:
+        fid = _id_geo(capa, p)
+        if fid is not None:
+            capa.por_provincia[p] = fid
+    return capa
+
 # ─────────────────────────────────────────────
 # Cargar datos
 # ─────────────────────────────────────────────
-try:
-    DF_ANUAL = load_anual(VS_CODE_PATH, SHEET_ANUAL); ANUAL_OK = True
-except Exception as e:
-    DF_ANUAL = pd.DataFrame(); ANUAL_OK = False; ANUAL_ERR = str(e)
+DATA_VERSION = _version_archivo(VS_CODE_PATH)
+DATOS        = load_datos(VS_CODE_PATH, DATA_VERSION)
 
-try:
-    DF_TRIM = load_trim(VS_CODE_PATH, SHEET_TRIM); TRIM_OK = True
-except Exception as e:
-    DF_TRIM = pd.DataFrame(); TRIM_OK = False
-
-try:
-    DF_ART = load_art(VS_CODE_PATH, SHEET_ART, LABEL_ART); ART_OK = True
-except Exception as e:
-    DF_ART = pd.DataFrame(); ART_OK = False
-
-try:
-    DF_VAB_SECTOR = load_vab_tabla(VS_CODE_PATH, SHEET_VAB_SECTOR); VAB_SECT_OK = True
-except Exception as e:
-    DF_VAB_SECTOR = pd.DataFrame(); VAB_SECT_OK = False
-
-try:
-    DF_VAB_RAMAS = load_vab_tabla(VS_CODE_PATH, SHEET_VAB_RAMAS); VAB_RAMAS_OK = True
-except Exception as e:
-    DF_VAB_RAMAS = pd.DataFrame(); VAB_RAMAS_OK = False
+DF_ANUAL      = DATOS.anual;      ANUAL_OK     = SHEET_ANUAL      not in DATOS.errores
+DF_TRIM       = DATOS.trim;       TRIM_OK      = SHEET_TRIM       not in DATOS.errores
+DF_ART        = DATOS.art;        ART_OK       = SHEET_ART        not in DATOS.errores
+DF_VAB_SECTOR = DATOS.vab_sector; VAB_SECT_OK  = SHEET_VAB_SECTOR not in DATOS.errores
+DF_VAB_RAMAS  = DATOS.vab_ramas;  VAB_RAMAS_OK = SHEET_VAB_RAMAS  not in DATOS.errores
+ANUAL_ERR     = DATOS.errores.get(SHEET_ANUAL, "")
 
 # ─────────────────────────────────────────────
 # Catálogos
@@ -337,106 +486,214 @@ def _source(v):
 # ─────────────────────────────────────────────
 # Helpers de series
 # ─────────────────────────────────────────────
+def _indexar_series(df):
+    """
+    (provincia, variable) -> (period, value, period_num) ordenados por período
+    y sin NaN. Cada serie es un slice (vista) de tres arrays contiguos, de
+    sólo lectura, ordenados una única vez.
+    """
+    if df is None or df.empty:
+        return {}
+    d = df.dropna(subset=["value"]).sort_values(
+        ["provincia","variable","period_num"], kind="stable"
+    )
+    periods = d["period"].to_numpy(dtype=object)
+    values  = d["value"].to_numpy(dtype=float)
+    nums    = d["period_num"].to_numpy()
+    for arr in (periods, values, nums):
+        arr.flags.writeable = False
+    grupos = d.groupby(["provincia","variable"], sort=False, observed=True).indices
+    store = {}
+    for (prov, var), pos in grupos.items():
+        a, b = pos[0], pos[-1] + 1
+        store[(str(prov), str(var))] = (periods[a:b], values[a:b], nums[a:b])
+    return store
+
+@st.cache_resource(max_entries=VERSIONES_CACHE_MAX, show_spinner=False)
+def _series_store(version):
+    """Índice de series por fuente, armado una vez por versión de datos."""
+    return {
+        "anual": _indexar_series(DF_ANUAL),
+        "trim":  _indexar_series(DF_TRIM),
+        "art":   _indexar_series(DF_ART),
+    }
+
+SERIES = _series_store(DATA_VERSION)
+_SERIE_VACIA = (np.array([], dtype=object), np.array([], dtype=float), np.array([], dtype=int))
+
 def get_serie(prov, variable):
+    """(períodos, valores, period_num) como arrays de NumPy; vacíos si no hay datos."""
     src = _source(variable)
-    if src == "anual":
-        if DF_ANUAL.empty: return [],[],[]
-        sub = DF_ANUAL[(DF_ANUAL["provincia"]==prov)&(DF_ANUAL["variable"]==variable)]\
-              .sort_values("period_num").dropna(subset=["value"])
-        return sub["period"].tolist(), sub["value"].tolist(), sub["period_num"].tolist()
-    elif src == "trim":
-        if DF_TRIM.empty: return [],[],[]
-        sub = DF_TRIM[(DF_TRIM["provincia"]==prov)&(DF_TRIM["variable"]==variable)]\
-              .sort_values("period_num").dropna(subset=["value"])
-        return sub["period"].tolist(), sub["value"].tolist(), sub["period_num"].tolist()
-    else:
-        if DF_ART.empty: return [],[],[]
-        sub = DF_ART[(DF_ART["provincia"]==prov)]\
-              .sort_values("period_num").dropna(subset=["value"])
-        return sub["period"].tolist(), sub["value"].tolist(), sub["period_num"].tolist()
+    key = (prov, LABEL_ART if src == "art" else variable)
+    return SERIES[src].get(key, _SERIE_VACIA)
 
 def kpi_last(periods, values):
-    if not periods: return None, None
+    if len(periods) == 0: return None, None
     return periods[-1], values[-1]
 
 # ─────────────────────────────────────────────
 # ✅ Calcular ratio para mapa por indicadores
 # ─────────────────────────────────────────────
+def _tabla_variable(variable):
+    """Filas con dato de `variable` en su tabla fuente (anual / trim / art)."""
+    src = _source(variable)
+    df = {"anual": DF_ANUAL, "trim": DF_TRIM, "art": DF_ART}[src]
+    if df.empty:
+        return pd.DataFrame(columns=["provincia","period","period_num","value"])
+    if src != "art":
+        df = df[df["variable"] == variable]
+    return df.dropna(subset=["value"])[["provincia","period","period_num","value"]]
+
+def _pivot_provincias(df, columnas=None):
+    """provincia × period_num, con una fila por provincia de PROVINCIAS_LIST."""
+    wide = df.pivot_table(index="provincia", columns="period_num", values="value",
+                          aggfunc="last", observed=True)
+    return wide.reindex(index=PROVINCIAS_LIST, columns=columnas)
+
+def _ultima_columna_valida(arr):
+    """Por fila: (tiene dato, índice de la última columna con dato)."""
+    m = ~np.isnan(arr)
+    return m.any(axis=1), m.shape[1] - 1 - np.argmax(m[:, ::-1], axis=1)
+
+@st.cache_data(max_entries=len(MAPA_IND_RATIOS) * VERSIONES_CACHE_MAX, show_spinner=False)
+def _ratio_mapa(ratio_key, version):
+    cfg = MAPA_IND_RATIOS[ratio_key]
+    num = _tabla_variable(cfg["num"])
+    den = _tabla_variable(cfg["den"])
+
+    periodos = num["period_num"].tolist() + den["period_num"].tolist()
+    columnas = sorted(set(periodos))
+    etiquetas = dict(zip(periodos, num["period"].tolist() + den["period"].tolist()))
+    if not columnas:
+        return pd.DataFrame({"provincia": PROVINCIAS_LIST,
+                             "value": [None] * len(PROVINCIAS_LIST),
+                             "periodo": ["—"] * len(PROVINCIAS_LIST)})
+
+    num_w = _pivot_provincias(num, columnas).to_numpy(dtype=float)
+    den_w = _pivot_provincias(den, columnas).to_numpy(dtype=float)
+    filas = np.arange(len(PROVINCIAS_LIST))
+
+    hay_num, ult_num = _ultima_columna_valida(num_w)
+    hay_den, ult_den = _ultima_columna_valida(den_w)
+
+    # Último período del numerador; si el denominador no tiene dato en ese
+    # mismo período, se usa el último período (y valor) del denominador.
+    val_num   = num_w[filas, ult_num]
+    den_mismo = den_w[filas, ult_num]
+    coincide  = ~np.isnan(den_mismo)
+    col_per   = np.where(coincide, ult_num, ult_den)
+    val_den   = np.where(coincide, den_mismo, den_w[filas, ult_den])
+
+    ok    = hay_num & hay_den
+    valid = ok & ~np.isnan(val_den) & (val_den != 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = val_num / val_den * 100
+
+    periodo = [
+        str(etiquetas[columnas[c]]) if o else "—"
+        for o, c in zip(ok, col_per)
+    ]
+    return pd.DataFrame({
+        "provincia": PROVINCIAS_LIST,
+        "value":     [float(r) if v else None for r, v in zip(ratio, valid)],
+        "periodo":   periodo,
+    })
+
 def get_ratio_mapa(ratio_key):
     """
     Calcula el ratio num/den * 100 para cada provincia,
     usando el último período común disponible.
     Devuelve df con [provincia, value, periodo].
     """
-    cfg = MAPA_IND_RATIOS[ratio_key]
-    var_num = cfg["num"]
-    var_den = cfg["den"]
-
-    rows = []
-    for prov in PROVINCIAS_LIST:
-        p_num, v_num, _ = get_serie(prov, var_num)
-        p_den, v_den, _ = get_serie(prov, var_den)
+    return _ratio_mapa(ratio_key, DATA_VERSION)
 
-        if not p_num or not p_den:
-            rows.append({"provincia": prov, "value": None, "periodo": "—"})
+# ─────────────────────────────────────────────
+# Cubo VAB: provincia × sector/rama × año → % del total provincial
+# ─────────────────────────────────────────────
+class CuboVAB(NamedTuple):
+    anios:   list           # columnas de año, en el orden de la hoja
+    vab:     pd.DataFrame   # (provincia, clave) × año, numérico, todas las filas
+    sector:  pd.Series      # nombre original de cada fila de `vab`
+    total:   pd.DataFrame   # provincia × año (suma ignorando NaN)
+    ultimo:  pd.Series      # (provincia, clave) -> vab del último año (primera fila si se repite)
+    mapa:    pd.DataFrame   # provincia × clave: % del total en el último año
+    top:     dict           # provincia -> DataFrame [sector, vab, pct] ordenado desc
+    nombres: list           # sectores/ramas disponibles, ordenados
+
+def _clave_sector(nombre):
+    return str(nombre).strip().lower()
+
+def _armar_cubo_vab(df_tabla):
+    if df_tabla is None or df_tabla.empty:
+        return None
+    anios = list(df_tabla.columns[2:])
+    col_last = anios[-1]
+    vab = df_tabla[anios].apply(pd.to_numeric, errors="coerce")
+    vab.index = pd.MultiIndex.from_arrays(
+        [df_tabla["provincia"], df_tabla["sector"].str.lower()], names=["provincia","clave"]
+    )
+    sector = pd.Series(df_tabla["sector"].to_numpy(), index=vab.index)
+    total  = vab.groupby(level="provincia", sort=False).sum()
+
+    # Una fila por (provincia, clave): si hay repetidas vale la primera
+    ult   = vab[col_last][~vab.index.duplicated(keep="first")]
+    tot_p = total[col_last].reindex(ult.index.get_level_values("provincia")).to_numpy()
+    pct   = (ult / tot_p * 100).where(tot_p > 0)
+    mapa  = pct.unstack("clave")
+
+    top = {}
+    for prov, df_p in vab[col_last].groupby(level="provincia", sort=False):
+        df_p = pd.DataFrame({"sector": sector.loc[prov].to_numpy(),
+                             "vab":    df_p.to_numpy()}).dropna(subset=["vab"])
+        tot = df_p["vab"].sum()
+        if tot == 0:
             continue
-
-        # Usar el último período del numerador y buscar ese mismo en el denominador
-        last_period = p_num[-1]
-        last_val_num = v_num[-1]
-
-        # Buscar el valor del denominador en ese mismo período
-        if last_period in p_den:
-            idx = p_den.index(last_period)
-            last_val_den = v_den[idx]
-        else:
-            # Si no coincide el período exacto, usar el último del denominador
-            last_val_den = v_den[-1]
-            last_period  = p_den[-1]
-
-        if last_val_den and not pd.isna(last_val_den) and last_val_den != 0:
-            ratio = (last_val_num / last_val_den) * 100
-        else:
-            ratio = None
-
-        rows.append({"provincia": prov, "value": ratio, "periodo": str(last_period)})
-
-    return pd.DataFrame(rows)
+        df_p["pct"] = (df_p["vab"]/tot*100).round(1)
+        top[prov] = df_p.sort_values("pct",ascending=False).reset_index(drop=True)
+
+    nombres = sorted(df_tabla["sector"].dropna().astype(str).str.strip().unique().tolist())
+    return CuboVAB(anios, vab, sector, total, ult, mapa, top, nombres)
+
+@st.cache_resource(max_entries=VERSIONES_CACHE_MAX, show_spinner=False)
+def _cubos_vab(version):
+    return {
+        SHEET_VAB_SECTOR: _armar_cubo_vab(DF_VAB_SECTOR) if VAB_SECT_OK  else None,
+        SHEET_VAB_RAMAS:  _armar_cubo_vab(DF_VAB_RAMAS)  if VAB_RAMAS_OK else None,
+    }
+
+CUBO_VAB_SECTOR = _cubos_vab(DATA_VERSION)[SHEET_VAB_SECTOR]
+CUBO_VAB_RAMAS  = _cubos_vab(DATA_VERSION)[SHEET_VAB_RAMAS]
+
+def _vab_ultimo(cubo, prov, nombre):
+    """(vab del sector en el último año, total de la provincia) o (None, None)."""
+    if cubo is None or prov not in cubo.total.index:
+        return None, None
+    col_last = cubo.anios[-1]
+    total = cubo.total.at[prov, col_last]
+    return cubo.ultimo.get((prov, _clave_sector(nombre))), total
 
 # ─────────────────────────────────────────────
 # VAB industria desde vabporsector
 # ─────────────────────────────────────────────
 def get_vab_industria(prov):
-    if not VAB_SECT_OK or DF_VAB_SECTOR.empty:
+    if CUBO_VAB_SECTOR is None or prov not in CUBO_VAB_SECTOR.total.index:
         return "—", "—"
-    df_p = DF_VAB_SECTOR[DF_VAB_SECTOR["provincia"]==prov].copy()
-    if df_p.empty: return "—","—"
-    col_last = df_p.columns[-1]
-    df_p["vab"] = pd.to_numeric(df_p[col_last], errors="coerce")
-    total = df_p["vab"].sum()
+    ind, total = _vab_ultimo(CUBO_VAB_SECTOR, prov, SECTOR_INDUSTRIA)
     if total == 0: return "—","—"
-    ind = df_p[df_p["sector"].str.lower() == SECTOR_INDUSTRIA.lower()]
-    if ind.empty: return "—","—"
-    pct = ind["vab"].values[0] / total * 100
-    return fmt_pct_plain(pct), str(col_last)
+    if ind is None: return "—","—"
+    pct = ind / total * 100
+    return fmt_pct_plain(pct), str(CUBO_VAB_SECTOR.anios[-1])
 
 # ─────────────────────────────────────────────
 # Insight dinámico
 # ─────────────────────────────────────────────
-def _top_vab(df_tabla, prov, n=10):
-    df_p = df_tabla[df_tabla["provincia"]==prov].copy()
-    if df_p.empty: return pd.DataFrame()
-    col_last = df_p.columns[-1]
-    df_p["vab"] = pd.to_numeric(df_p[col_last], errors="coerce")
-    df_p = df_p.dropna(subset=["vab"])
-    total = df_p["vab"].sum()
-    if total==0: return pd.DataFrame()
-    df_p["pct"] = (df_p["vab"]/total*100).round(1)
-    return df_p.sort_values("pct",ascending=False).reset_index(drop=True).head(n)
+def _top_vab(cubo, prov, n=10):
+    if cubo is None or prov not in cubo.top: return pd.DataFrame()
+    return cubo.top[prov].head(n)
 
 def get_insight_y_vab(prov_name):
-    top_sect  = _top_vab(DF_VAB_SECTOR, prov_name, 10) if VAB_SECT_OK  else pd.DataFrame()
-    top_ramas = _top_vab(DF_VAB_RAMAS,  prov_name, 10) if VAB_RAMAS_OK else pd.DataFrame()
+    top_sect  = _top_vab(CUBO_VAB_SECTOR, prov_name, 10)
+    top_ramas = _top_vab(CUBO_VAB_RAMAS,  prov_name, 10)
     if top_sect.empty:
         return None, None, top_ramas if not top_ramas.empty else None
 
@@ -452,17 +709,10 @@ def get_insight_y_vab(prov_name):
     else:
         texto += "."
 
-    ind_row = DF_VAB_SECTOR[
-        (DF_VAB_SECTOR["provincia"] == prov_name) &
-        (DF_VAB_SECTOR["sector"].str.lower() == SECTOR_INDUSTRIA.lower())
-    ]
+    ind_vab, total = _vab_ultimo(CUBO_VAB_SECTOR, prov_name, SECTOR_INDUSTRIA)
     top2_lower = [s1["sector"].lower()] + ([s2["sector"].lower()] if s2 is not None else [])
 
-    if (not ind_row.empty) and (SECTOR_INDUSTRIA.lower() not in top2_lower):
-        col_last = ind_row.columns[-1]
-        ind_vab  = pd.to_numeric(ind_row.iloc[0][col_last], errors="coerce")
-        df_p     = DF_VAB_SECTOR[DF_VAB_SECTOR["provincia"] == prov_name].copy()
-        total    = pd.to_numeric(df_p.iloc[:, -1], errors="coerce").sum()
+    if (ind_vab is not None) and (SECTOR_INDUSTRIA.lower() not in top2_lower):
         if total > 0 and not pd.isna(ind_vab):
             texto += f" La industria manufacturera pesa <strong>{fmt(ind_vab/total*100)}</strong>."
 
@@ -618,7 +868,7 @@ def fig_comp_linea(seleccionadas, variable):
     for pname in seleccionadas:
         color = PROVINCIAS[pname]["color"]
         periods, values, _ = get_serie(pname, variable)
-        if periods:
+        if len(periods):
             fig.add_trace(go.Scatter(
                 x=periods, y=values,
                 mode="lines+markers", name=pname,
@@ -642,13 +892,77 @@ def fig_comp_linea(seleccionadas, variable):
     )
     return fig
 
+# ─────────────────────────────────────────────
+# Ficha provincial: armada una vez por provincia y versión de datos
+# ─────────────────────────────────────────────
+FICHAS_CACHE_MAX = 24 * VERSIONES_CACHE_MAX   # una ficha por provincia y versión
+
+class Ficha(NamedTuple):
+    kpis:      str                   # HTML de las 4 tarjetas
+    insight:   Optional[str]         # HTML del recuadro de insight
+    fig_sect:  Optional[go.Figure]   # VAB por sector
+    fig_ramas: Optional[go.Figure]   # ramas industriales
+
+def _insight_html(txt_insight):
+    return (
+        f'<div style="background:#f8fafc;border:1px solid #e2e8f4;'
+        f'border-left:4px solid #1B2D6B;border-radius:10px;padding:0.85rem 1.1rem;'
+        f'font-size:0.875rem;color:#334155;line-height:1.6;'
+        f'display:flex;gap:0.75rem;align-items:flex-start;margin:0.5rem 0 1.2rem 0;">'
+        f'<span style="font-size:1rem;flex-shrink:0;margin-top:1px">💡</span>'
+        f'<span style="font-family:\'Sora\',sans-serif;">{txt_insight}</span>'
+        f'</div>'
+    )
+
+@st.cache_resource(max_entries=FICHAS_CACHE_MAX, show_spinner=False)
+def _ficha(prov, version):
+    """
+    Todo lo que muestra la ficha de `prov`, ya armado. Compartido entre
+    sesiones sin copiar (cache_resource) y acotado a FICHAS_CACHE_MAX
+    entradas (LRU); `version` sólo participa de la clave de caché.
+
+    Las figuras se guardan como go.Figure ya validadas: st.plotly_chart sólo
+    las serializa. Un dict o JSON cacheado se volvería a validar como
+    Figure en cada rerun. Son de sólo lectura: no modificarlas.
+    """
+    txt_insight, top_sect, top_ramas = get_insight_y_vab(prov)
+
+    fig_sect = fig_ramas = None
+    if top_sect is not None and not top_sect.empty:
+        fig_sect = fig_barras_h_azul("Composición VAB por sector (%)",
+                                     top_sect["sector"].tolist(),
+                                     top_sect["pct"].tolist(), n=10)
+    if top_ramas is not None and not top_ramas.empty:
+        fig_ramas = fig_barras_h_azul("Principales ramas industriales (%)",
+                                      top_ramas["sector"].tolist(),
+                                      top_ramas["pct"].tolist(), n=10)
+
+    return Ficha(
+        render_4_kpis(prov),
+        _insight_html(txt_insight) if txt_insight else None,
+        fig_sect,
+        fig_ramas,
+    )
+
+def get_ficha(prov):
+    return _ficha(prov, DATA_VERSION)
+
 # ─────────────────────────────────────────────
 # Mapa helper
 # ─────────────────────────────────────────────
-def build_map_and_rank(df_map_in, geo, title_text, color_scale="Blues", kind="pct"):
-    if df_map_in is None or df_map_in.empty or geo is None:
-        return go.Figure(), pd.DataFrame()
+# Sin plotly-geo.min.js (scripts/actualizar_plotly_geo.py) el iframe quedaría vacío
+_MAPA_COMPONENTE = (
+    components.declare_component("mapa_coropletas", path=MAPA_COMPONENTE_DIR)
+    if all(os.path.exists(os.path.join(MAPA_COMPONENTE_DIR, f))
+           for f in ["index.html", "plotly-geo.min.js"]) else None
+)
+
+@st.cache_resource(max_entries=VERSIONES_CACHE_MAX, show_spinner=False)
+def load_capa_geo(version):
+    """GeoJSON + featureidkey + ids por provincia, armados una vez por versión de datos."""
+    return _armar_capa_geo(load_argentina_geojson(), PROVINCIAS_LIST)
 
+def _ranking_mapa(df_map_in, kind="pct"):
     def _fmt_rank(v):
         if v is None or pd.isna(v): return "—"
         try: vv = float(v)
@@ -656,53 +970,36 @@ def build_map_and_rank(df_map_in, geo, title_text, color_scale="Blues", kind="pc
         if kind == "pct": return fmt_pct_plain(vv, 1)
         return fmt_int_es(vv)
 
-    geo_features = geo.get("features", [])
-    if not geo_features:
-        return go.Figure(), pd.DataFrame()
+    df_rank = df_map_in.copy().sort_values("value", ascending=False).reset_index(drop=True)
+    df_rank.index = df_rank.index + 1
+    df_rank = df_rank.rename(columns={"provincia": "Provincia", "value": "Valor", "periodo": "Período"})
+    df_rank["Valor"] = df_rank["Valor"].apply(_fmt_rank)
+    return df_rank
 
-    sample = geo_features[0].get("properties", {}) if geo_features else {}
-    feat_key = (
-        "properties.id" if "id" in sample else
-        "properties.nombre" if "nombre" in sample else
-        "properties.name"
-    )
+def _df_plot_mapa(df_map_in, geo):
+    df_plot = df_map_in.copy()
+    df_plot["id"] = [_id_geo(geo, p) for p in df_plot["provincia"]]
+    return df_plot.dropna(subset=["id"])
 
-    geo_df = pd.DataFrame({
-        "id": [
-            f.get("properties", {}).get("id",
-            f.get("properties", {}).get("ID",
-            f.get("properties", {}).get("fid",
-            f.get("properties", {}).get("FID",
-            f.get("properties", {}).get("nombre", i)))))
-            for i, f in enumerate(geo_features)
-        ],
-        "nombre_geo": [
-            f.get("properties", {}).get("nombre",
-            f.get("properties", {}).get("name",
-            f.get("properties", {}).get("NAME_1", "?")))
-            for f in geo_features
-        ],
-    })
-    geo_df["nombre_norm"] = geo_df["nombre_geo"].apply(_norm)
+def build_map_and_rank(df_map_in, geo, title_text, color_scale="Blues", kind="pct"):
+    """`geo` es la CapaGeo cacheada (ver load_capa_geo)."""
+    if df_map_in is None or df_map_in.empty or geo is None:
+        return go.Figure(), pd.DataFrame()
 
-    df_map = df_map_in.copy()
-    df_map["nombre_norm"] = df_map["provincia"].apply(_norm)
-    df_map["nombre_norm"] = df_map["nombre_norm"].replace(_ALIAS_GEO)
-    df_map = df_map.merge(geo_df[["id", "nombre_norm"]], on="nombre_norm", how="left")
-    df_plot = df_map.dropna(subset=["id"]).copy()
+    df_plot = _df_plot_mapa(df_map_in, geo)
 
     fig = px.choropleth(
-        df_plot, geojson=geo, locations="id", featureidkey=feat_key,
+        df_plot, geojson=geo.geojson, locations="id", featureidkey=geo.featureidkey,
         color="value", hover_name="provincia",
         color_continuous_scale=color_scale, labels={"value": "Valor"},
         projection="mercator",
     )
     fig.update_traces(hovertemplate="<b>%{hovertext}</b><br>%{z:.1f}%<extra></extra>")
-    fig.update_geos(visible=False, lataxis_range=[-60, -22], lonaxis_range=[-75, -52])
+    fig.update_geos(visible=False, lataxis_range=MAPA_LAT_RANGE, lonaxis_range=MAPA_LON_RANGE)
     fig.update_layout(
         title=dict(text=title_text, x=0.01),
         margin=dict(t=50, b=10, l=10, r=10),
-        height=700,
+        height=MAPA_ALTO_PX,
         coloraxis_colorbar=dict(
             title=dict(text="%", font=dict(size=10, family="DM Mono, monospace")),
             tickfont=dict(size=9, family="DM Mono, monospace"),
@@ -712,61 +1009,149 @@ def build_map_and_rank(df_map_in, geo, title_text, color_scale="Blues", kind="pc
         font=dict(family="Sora, sans-serif", color="#31333F"),
     )
 
-    df_rank = df_map_in.copy().sort_values("value", ascending=False).reset_index(drop=True)
-    df_rank.index = df_rank.index + 1
-    df_rank = df_rank.rename(columns={"provincia": "Provincia", "value": "Valor", "periodo": "Período"})
-    df_rank["Valor"] = df_rank["Valor"].apply(_fmt_rank)
-    return fig, df_rank
+    return fig, _ranking_mapa(df_map_in, kind)
+
+def render_mapa(df_map_in, geo, title_text, key, color_scale="Blues"):
+    """
+    Dibuja el mapa. En modo cliente usa el componente mapa_coropletas: la
+    geometría viaja una vez por sesión y cada selección manda sólo los 24
+    valores y sus etiquetas. Si el componente no está disponible, usa
+    st.plotly_chart con la figura completa.
+    """
+    if not MAPA_MODO_CLIENTE or _MAPA_COMPONENTE is None:
+        fig, _ = build_map_and_rank(df_map_in, geo, title_text, color_scale=color_scale)
+        st.plotly_chart(fig, use_container_width=True,
+                        config={"displayModeBar": False, "scrollZoom": False, "doubleClick": False})
+        return
+
+    df_plot = _df_plot_mapa(df_map_in, geo)
+    flag_geo = f"_mapa_geo_{key}"
+    enviar_geo = st.session_state.get(flag_geo) != geo.version
+
+    pedido = _MAPA_COMPONENTE(
+        geo_version  = geo.version,
+        geojson      = geo.geojson if enviar_geo else None,
+        featureidkey = geo.featureidkey,
+        locations    = df_plot["id"].tolist(),
+        z            = [None if pd.isna(v) else float(v) for v in df_plot["value"]],
+        hovertext    = df_plot["provincia"].tolist(),
+        title        = title_text,
+        colorscale   = px.colors.get_colorscale(color_scale),
+        height       = MAPA_ALTO_PX,
+        lat_range    = MAPA_LAT_RANGE,
+        lon_range    = MAPA_LON_RANGE,
+        key          = key,
+        default      = None,
+    )
+    st.session_state[flag_geo] = geo.version
+
+    # El iframe perdió la geometría (p. ej. se recreó): se reenvía una vez
+    flag_pedido = f"_mapa_pedido_{key}"
+    if pedido and pedido != st.session_state.get(flag_pedido):
+        st.session_state[flag_pedido] = pedido
+        st.session_state.pop(flag_geo, None)
+        st.rerun()
 
 # ─────────────────────────────────────────────
 # VAB: utilitarios para mapas de sectores/ramas
 # ─────────────────────────────────────────────
-def _vab_last_col(df_tabla):
-    if df_tabla is None or df_tabla.empty: return None
-    return df_tabla.columns[-1]
+def _df_map_share(cubo, nombre):
+    """% del total de cada provincia para un sector/rama: un slice de columna del cubo."""
+    if cubo is None: return pd.DataFrame()
+    col_last = cubo.anios[-1]
+    provs = [p for p in PROVINCIAS_LIST if p in cubo.total.index]
+    clave = _clave_sector(nombre)
+    if clave in cubo.mapa.columns:
+        vals = cubo.mapa[clave].reindex(provs)
+    else:
+        vals = pd.Series(np.nan, index=provs)
+    return pd.DataFrame({
+        "provincia": provs,
+        "value":     [None if pd.isna(v) else float(v) for v in vals],
+        "periodo":   str(col_last),
+    })
 
 def build_df_map_sector_share(sector_name: str):
-    if not VAB_SECT_OK or DF_VAB_SECTOR.empty: return pd.DataFrame()
-    col_last = _vab_last_col(DF_VAB_SECTOR)
-    if col_last is None: return pd.DataFrame()
-    rows = []
-    for prov in PROVINCIAS_LIST:
-        df_p = DF_VAB_SECTOR[DF_VAB_SECTOR["provincia"] == prov].copy()
-        if df_p.empty: continue
-        df_p["vab"] = pd.to_numeric(df_p[col_last], errors="coerce")
-        total = df_p["vab"].sum()
-        if not total or pd.isna(total) or total == 0:
-            rows.append({"provincia": prov, "value": None, "periodo": str(col_last)}); continue
-        sel = df_p[df_p["sector"].str.lower() == str(sector_name).strip().lower()]
-        if sel.empty:
-            rows.append({"provincia": prov, "value": None, "periodo": str(col_last)}); continue
-        val = pd.to_numeric(sel["vab"].values[0], errors="coerce")
-        pct = (val / total * 100) if (pd.notna(val) and total > 0) else None
-        rows.append({"provincia": prov, "value": pct, "periodo": str(col_last)})
-    return pd.DataFrame(rows)
+    return _df_map_share(CUBO_VAB_SECTOR, sector_name)
 
 def build_df_map_industria_share_total():
     return build_df_map_sector_share(SECTOR_INDUSTRIA)
 
 def build_df_map_rama_share_industrial(rama_name: str):
-    if not VAB_RAMAS_OK or DF_VAB_RAMAS.empty: return pd.DataFrame()
-    col_last = _vab_last_col(DF_VAB_RAMAS)
-    if col_last is None: return pd.DataFrame()
-    rows = []
+    return _df_map_share(CUBO_VAB_RAMAS, rama_name)
+
+# ─────────────────────────────────────────────
+# Precalentamiento: cachés llenas antes del primer usuario
+#
+# La primera sesión de cada versión de datos lanza precalentar() en un hilo.
+# Para que esa sesión no sea la de un usuario, el deploy abre una sesión sin
+# navegador con ?precalentar=1 (scripts/precalentar_servidor.py), que espera
+# a que termine el hilo.
+# ─────────────────────────────────────────────
+PRECALENTAR = os.environ.get("MONITOR_PRECALENTAR", "1") != "0"
+PARAM_PRECALENTAR = "precalentar"
+
+_LOG = get_logger("monitor_provincial")
+
+class Precalentamiento(NamedTuple):
+    version:  str
+    fichas:   int
+    ratios:   int
+    segundos: float
+
+def precalentar(version):
+    """
+    Llena las cachés de la versión de datos `version`: las fichas de cada
+    provincia, los ratios de MAPA_IND_RATIOS, la capa geográfica y los
+    cubos VAB. Los mapas de sectores/ramas no tienen caché propia: son un
+    corte de columna de esos cubos. Devuelve cuánto se armó y cuánto tardó.
+    """
+    t0 = time.perf_counter()
+
     for prov in PROVINCIAS_LIST:
-        df_p = DF_VAB_RAMAS[DF_VAB_RAMAS["provincia"] == prov].copy()
-        if df_p.empty: continue
-        df_p["vab"] = pd.to_numeric(df_p[col_last], errors="coerce")
-        total_ind = df_p["vab"].sum()
-        if not total_ind or pd.isna(total_ind) or total_ind == 0:
-            rows.append({"provincia": prov, "value": None, "periodo": str(col_last)}); continue
-        sel = df_p[df_p["sector"].str.lower() == str(rama_name).strip().lower()]
-        if sel.empty:
-            rows.append({"provincia": prov, "value": None, "periodo": str(col_last)}); continue
-        val = pd.to_numeric(sel["vab"].values[0], errors="coerce")
-        pct = (val / total_ind * 100) if (pd.notna(val) and total_ind > 0) else None
-        rows.append({"provincia": prov, "value": pct, "periodo": str(col_last)})
-    return pd.DataFrame(rows)
+        _ficha(prov, version)
+
+    for ratio_key in MAPA_IND_RATIOS:
+        _ratio_mapa(ratio_key, version)
+
+    load_capa_geo(version)
+    _cubos_vab(version)
+
+    return Precalentamiento(version, len(PROVINCIAS_LIST), len(MAPA_IND_RATIOS),
+                            time.perf_counter() - t0)
+
+def _reportar(p, que="Precalentamiento"):
+    _LOG.info("%s (datos %s): %d fichas y %d ratios en %.2f s",
+              que, p.version, p.fichas, p.ratios, p.segundos)
+
+def _precalentar_y_reportar(version):
+    try:
+        _reportar(precalentar(version))
+    except Exception:
+        # Sin precalentamiento las cachés se llenan a pedido, como antes
+        _LOG.exception("Precalentamiento (datos %s): falló", version)
+
+@st.cache_resource(max_entries=VERSIONES_CACHE_MAX, show_spinner=False)
+def _precalentamiento_en_segundo_plano(version):
+    """Un hilo por proceso y versión de datos: la primera sesión lo lanza y no lo espera."""
+    hilo = threading.Thread(target=_precalentar_y_reportar, args=(version,),
+                            name="precalentamiento", daemon=True)
+    hilo.start()
+    return hilo
+
+_CTX_SCRIPT = get_script_run_ctx(suppress_warning=True)
+
+if __name__ == "__main__" and _CTX_SCRIPT is None and "--medir-precalentamiento" in sys.argv:
+    # Benchmark: `python app.py --medir-precalentamiento` mide en un proceso
+    # aparte cuánto tarda precalentar() y sale. No llena las cachés de ningún
+    # servidor; para eso está scripts/precalentar_servidor.py.
+    _reportar(precalentar(DATA_VERSION), que="Medición de precalentamiento (benchmark)")
+    raise SystemExit(0)
+
+if PRECALENTAR and _CTX_SCRIPT is not None:
+    _hilo_precalentamiento = _precalentamiento_en_segundo_plano(DATA_VERSION)
+    if st.query_params.get(PARAM_PRECALENTAR) == "1":
+        _hilo_precalentamiento.join()
 
 # ─────────────────────────────────────────────
 # Header
@@ -827,12 +1212,9 @@ with tab_ficha:
         unsafe_allow_html=True,
     )
 
-    resultado       = get_insight_y_vab(prov_name)
-    txt_insight     = resultado[0]
-    vab_top10_sect  = resultado[1]
-    vab_top10_ramas = resultado[2]
+    ficha = get_ficha(prov_name)
 
-    st.markdown(render_4_kpis(prov_name), unsafe_allow_html=True)
+    st.markdown(ficha.kpis, unsafe_allow_html=True)
 
     st.markdown(
         '<div style="font-family:\'Sora\',sans-serif;font-size:1.2rem;font-weight:700;'
@@ -840,37 +1222,20 @@ with tab_ficha:
         unsafe_allow_html=True,
     )
 
-    if txt_insight:
-        st.markdown(
-            f'<div style="background:#f8fafc;border:1px solid #e2e8f4;'
-            f'border-left:4px solid #1B2D6B;border-radius:10px;padding:0.85rem 1.1rem;'
-            f'font-size:0.875rem;color:#334155;line-height:1.6;'
-            f'display:flex;gap:0.75rem;align-items:flex-start;margin:0.5rem 0 1.2rem 0;">'
-            f'<span style="font-size:1rem;flex-shrink:0;margin-top:1px">💡</span>'
-            f'<span style="font-family:\'Sora\',sans-serif;">{txt_insight}</span>'
-            f'</div>',
-            unsafe_allow_html=True,
-        )
+    if ficha.insight:
+        st.markdown(ficha.insight, unsafe_allow_html=True)
 
     with st.container(border=True):
-        if vab_top10_sect is not None and not vab_top10_sect.empty:
-            st.plotly_chart(
-                fig_barras_h_azul("Composición VAB por sector (%)",
-                                  vab_top10_sect["sector"].tolist(),
-                                  vab_top10_sect["pct"].tolist(), n=10),
-                use_container_width=True, config={"displayModeBar": False},
-            )
+        if ficha.fig_sect is not None:
+            st.plotly_chart(ficha.fig_sect,
+                            use_container_width=True, config={"displayModeBar": False})
         else:
             st.info("Sin datos de VAB sectorial.")
 
     with st.container(border=True):
-        if vab_top10_ramas is not None and not vab_top10_ramas.empty:
-            st.plotly_chart(
-                fig_barras_h_azul("Principales ramas industriales (%)",
-                                  vab_top10_ramas["sector"].tolist(),
-                                  vab_top10_ramas["pct"].tolist(), n=10),
-                use_container_width=True, config={"displayModeBar": False},
-            )
+        if ficha.fig_ramas is not None:
+            st.plotly_chart(ficha.fig_ramas,
+                            use_container_width=True, config={"displayModeBar": False})
         else:
             st.info("Sin datos de ramas industriales.")
 
@@ -890,19 +1255,13 @@ with tab_mapa_sect:
         st.info("No hay datos disponibles de VAB por sector (`vabporsector`).")
     else:
         with st.spinner("Cargando mapa..."):
-            GEO = load_argentina_geojson()
+            GEO = load_capa_geo(DATA_VERSION)
 
         if GEO is None:
             st.error("⚠️ No se encontró el archivo `data/provincias_ign.geojson`.")
         else:
-            sectores_disponibles = sorted(
-                DF_VAB_SECTOR["sector"].dropna().astype(str).str.strip().unique().tolist()
-            )
-            ramas_disponibles = []
-            if VAB_RAMAS_OK and not DF_VAB_RAMAS.empty:
-                ramas_disponibles = sorted(
-                    DF_VAB_RAMAS["sector"].dropna().astype(str).str.strip().unique().tolist()
-                )
+            sectores_disponibles = CUBO_VAB_SECTOR.nombres
+            ramas_disponibles = CUBO_VAB_RAMAS.nombres if CUBO_VAB_RAMAS is not None else []
 
             c1, c2 = st.columns([1.2, 1.0], gap="medium")
             with c1:
@@ -938,11 +1297,9 @@ with tab_mapa_sect:
             if df_map is None or df_map.empty or df_map["value"].dropna().empty:
                 st.info("No hay datos suficientes para mostrar el mapa con esta selección.")
             else:
-                fig, df_rank = build_map_and_rank(df_map, GEO, title_text=titulo,
-                                                   color_scale="Blues", kind="pct")
                 with st.container(border=True):
-                    st.plotly_chart(fig, use_container_width=True,
-                                    config={"displayModeBar": False, "scrollZoom": False, "doubleClick": False})
+                    render_mapa(df_map, GEO, titulo, key="mapa_sect")
+                df_rank = _ranking_mapa(df_map, kind="pct")
                 st.markdown(
                     '<div style="font-family:\'Sora\',sans-serif;font-size:0.9rem;font-weight:600;'
                     'color:#1B2D6B;margin:1.2rem 0 0.5rem 0;">Ranking por provincia</div>',
@@ -984,18 +1341,15 @@ with tab_mapa_ind:
         title = f"<span style='font-family:Sora,sans-serif;font-size:13px;'>{label_lindo} · Mapa provincial ({periodo_label})</span>"
 
         with st.spinner("Cargando mapa..."):
-            GEO = load_argentina_geojson()
+            GEO = load_capa_geo(DATA_VERSION)
 
         if GEO is None:
             st.error("⚠️ No se encontró el archivo `data/provincias_ign.geojson`.")
         else:
-            fig, df_rank = build_map_and_rank(
-                df_mapa[["provincia","value","periodo"]],
-                GEO, title_text=title, color_scale="Blues", kind="pct",
-            )
+            df_mapa = df_mapa[["provincia","value","periodo"]]
             with st.container(border=True):
-                st.plotly_chart(fig, use_container_width=True,
-                                config={"displayModeBar": False, "scrollZoom": False, "doubleClick": False})
+                render_mapa(df_mapa, GEO, title, key="mapa_ind")
+            df_rank = _ranking_mapa(df_mapa, kind="pct")
             st.markdown(
                 '<div style="font-family:\'Sora\',sans-serif;font-size:0.9rem;font-weight:600;'
                 'color:#1B2D6B;margin:1.2rem 0 0.5rem 0;">Ranking por provincia</div>',
@@ -1051,7 +1405,7 @@ with tab_evol:
     rows = []
     for pname in seleccionadas:
         periods, values, _ = get_serie(pname, var_comp)
-        if periods and values:
+        if len(periods) and len(values):
             for p, v in zip(periods, values):
                 rows.append({"Período": p, "Provincia": pname, "Valor": v})
 
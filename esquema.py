@@ -0,0 +1,239 @@
+# ============================================================
+# Esquema del formato largo compartido por el ETL y el dashboard
+#
+# scripts/actualizar_datos.py lo usa para escribir el snapshot
+# Parquet y app.py para tipar lo que lee (snapshot o Excel).
+#
+# Columnas:
+# provincia  : category (nombre de provincia, sin espacios extra)
+# variable   : category
+# period     : category (etiqueta como en el Excel: 2004, I-96, oct-25)
+# period_num : int32    (número ordenable, según la frecuencia)
+# freq       : category (A = anual, Q = trimestral, M = mensual)
+# value      : float32
+#
+# period_num por frecuencia (ver numero_trimestral / numero_mensual y, a la
+# inversa, etiqueta_trimestral / etiqueta_mensual):
+# A -> año            2004
+# Q -> año * 10 + q   19961  (I-96)
+# M -> año * 100 + m  202510 (oct-25)
+#
+# También vive acá sha256_archivo: el hash con que el ETL firma el
+# manifest del snapshot y el dashboard lo verifica.
+# ============================================================
+
+from __future__ import annotations
+
+import datetime as dt
+import hashlib
+import os
+import re
+from functools import lru_cache
+from typing import Callable, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+
+# Subir cuando cambien columnas o tipos: el dashboard ignora un snapshot
+# escrito con otra versión del esquema y vuelve a leer el Excel.
+VERSION_ESQUEMA = 1
+
+FRECUENCIA_ANUAL = "A"
+FRECUENCIA_TRIMESTRAL = "Q"
+FRECUENCIA_MENSUAL = "M"
+
+FRECUENCIAS = [FRECUENCIA_ANUAL, FRECUENCIA_TRIMESTRAL, FRECUENCIA_MENSUAL]
+
+COLUMNAS = ["provincia", "variable", "period", "period_num", "freq", "value"]
+
+DTYPE_PERIOD_NUM = "int32"
+DTYPE_VALUE = "float32"
+
+# Textos que en las hojas equivalen a celda vacía
+_VACIOS = {"", "nan", "none"}
+
+
+def sha256_archivo(ruta: Union[str, os.PathLike]) -> str:
+    """sha256 del archivo, leído por bloques de 1 MB."""
+    h = hashlib.sha256()
+
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloque)
+
+    return h.hexdigest()
+
+
+def categorias(valores: pd.Series) -> pd.Categorical:
+    """
+    Texto sin espacios extra como Categorical, con las categorías en orden
+    de aparición (así se conserva el orden de la hoja).
+    """
+    if isinstance(valores.dtype, pd.CategoricalDtype):
+        return valores.array
+
+    texto = valores.astype(str).str.strip()
+
+    return pd.Categorical(texto, categories=pd.unique(texto))
+
+
+def tipar_largo(df: pd.DataFrame, freq: str) -> pd.DataFrame:
+    """
+    Lleva una tabla larga con provincia, variable, period, period_num y
+    value a los tipos del esquema, con la frecuencia `freq`.
+
+    Descarta las filas sin provincia o sin variable. Las columnas que no
+    son del esquema (por ejemplo `fila` en el snapshot) se conservan
+    adelante, sin cambios.
+    """
+    if freq not in FRECUENCIAS:
+        raise ValueError(f"Frecuencia desconocida: {freq}")
+
+    otras = [c for c in df.columns if c not in COLUMNAS]
+
+    out = df[otras].copy()
+    out["provincia"] = categorias(df["provincia"])
+    out["variable"] = categorias(df["variable"])
+    out["period"] = categorias(df["period"])
+    out["period_num"] = df["period_num"].astype(DTYPE_PERIOD_NUM)
+    out["freq"] = pd.Categorical([freq] * len(df), categories=FRECUENCIAS)
+    out["value"] = pd.to_numeric(df["value"], errors="coerce").astype(DTYPE_VALUE)
+
+    validas = (
+        ~out["provincia"].str.lower().isin(_VACIOS)
+        & ~out["variable"].str.lower().isin(_VACIOS)
+    )
+
+    out = out[validas.to_numpy()].reset_index(drop=True)
+
+    # Las categorías que quedaron sin filas no se arrastran
+    for col in ["provincia", "variable", "period"]:
+        out[col] = out[col].cat.remove_unused_categories()
+
+    return out
+
+
+# ============================================================
+# PERÍODOS TRIMESTRALES
+# ============================================================
+
+ROMANOS = {"1": "I", "2": "II", "3": "III", "4": "IV"}
+
+_TRIMESTRE_POR_ROMANO = {r: int(q) for q, r in ROMANOS.items()}
+
+
+def etiqueta_trimestre(valor: object) -> Optional[str]:
+    """
+    Etiqueta canónica ("I-96") de un encabezado trimestral: una fecha,
+    "1°TRIM 1996", "3 TRIMESTRE 1996", "I-96" o "II-1996". None si no
+    se reconoce.
+    """
+    if valor is None or pd.isna(valor):
+        return None
+
+    if isinstance(valor, pd.Timestamp):
+        q = (valor.month - 1) // 3 + 1
+        return f"{ROMANOS[str(q)]}-{str(valor.year)[-2:]}"
+
+    s = str(valor).strip().upper()
+    s = s.replace("º", "°")
+    s = s.replace(".", "")
+    s = re.sub(r"\s+", " ", s)
+
+    # 1°TRIM 1996 / 2 TRIM 1996 / 3 TRIMESTRE 1996
+    m = re.search(r"\b([1-4])\s*°?\s*(?:TRIM|TRIMESTRE)\s*(19\d{2}|20\d{2})\b", s)
+    if m:
+        return f"{ROMANOS[m.group(1)]}-{m.group(2)[-2:]}"
+
+    # I-96 / II-1996
+    m = re.match(r"^(I|II|III|IV)[-_/ ]?(\d{2}|\d{4})$", s)
+    if m:
+        return f"{m.group(1)}-{m.group(2)[-2:]}"
+
+    return None
+
+
+@lru_cache(maxsize=None)
+def numero_trimestral(valor: object) -> Optional[int]:
+    """
+    period_num (año * 10 + trimestre) de un encabezado trimestral, o None.
+    Los años de dos dígitos >= 90 son 19xx; el resto, 20xx.
+    """
+    etiqueta = etiqueta_trimestre(valor)
+
+    if etiqueta is None:
+        return None
+
+    romano, yy = etiqueta.split("-")
+    anio = 1900 + int(yy) if int(yy) >= 90 else 2000 + int(yy)
+
+    return anio * 10 + _TRIMESTRE_POR_ROMANO[romano]
+
+
+def etiqueta_trimestral(numero: int) -> str:
+    """Etiqueta canónica de un period_num trimestral: 19961 -> "I-96"."""
+    anio, q = divmod(int(numero), 10)
+    return f"{ROMANOS[str(q)]}-{anio % 100:02d}"
+
+
+def _numeros(valores: object, numero: Callable[[object], Optional[int]]) -> np.ndarray:
+    """
+    numero(valor) de cada valor, como int32 (0 si no se reconoce). Cada
+    valor distinto se interpreta una sola vez.
+    """
+    valores = pd.Series(valores, dtype=object).reset_index(drop=True)
+    numeros = {u: numero(u) or 0 for u in pd.unique(valores)}
+
+    return valores.map(numeros).to_numpy(dtype=DTYPE_PERIOD_NUM)
+
+
+def numeros_trimestrales(valores: object) -> np.ndarray:
+    """numero_trimestral de cada valor, como int32 (0 si no se reconoce)."""
+    return _numeros(valores, numero_trimestral)
+
+
+# ============================================================
+# PERÍODOS MENSUALES
+# ============================================================
+
+MESES = ["ene", "feb", "mar", "abr", "may", "jun", "jul", "ago", "sep", "oct", "nov", "dic"]
+
+_MES_POR_NOMBRE = {m: i for i, m in enumerate(MESES, 1)}
+_MES_POR_NOMBRE.update({"set": 9})  # "set-25" aparece en algunas planillas
+
+
+@lru_cache(maxsize=None)
+def numero_mensual(valor: object) -> Optional[int]:
+    """
+    period_num (año * 100 + mes) de un encabezado mensual: una fecha
+    (datetime / Timestamp) o una etiqueta tipo "oct-25", "oct-2025",
+    "octubre 2025" o "2025-10". None si no se reconoce.
+    """
+    if isinstance(valor, (dt.date, pd.Timestamp)):
+        return valor.year * 100 + valor.month
+
+    s = str(valor).strip().lower()
+
+    m = re.match(r"^([a-zé]{3})[a-zé]*[-_/ .]*'?(\d{2}|\d{4})$", s)
+    if m and m.group(1) in _MES_POR_NOMBRE:
+        anio = int(m.group(2))
+        anio = anio + 2000 if anio < 100 else anio
+        return anio * 100 + _MES_POR_NOMBRE[m.group(1)]
+
+    m = re.match(r"^(\d{4})[-/](\d{1,2})(?:[-/]\d{1,2})?(?:[ t].*)?$", s)
+    if m and 1 <= int(m.group(2)) <= 12:
+        return int(m.group(1)) * 100 + int(m.group(2))
+
+    return None
+
+
+def numeros_mensuales(valores: object) -> np.ndarray:
+    """numero_mensual de cada valor, como int32 (0 si no se reconoce)."""
+    return _numeros(valores, numero_mensual)
+
+
+def etiqueta_mensual(numero: int) -> str:
+    """Etiqueta canónica de un period_num mensual: 202510 -> "oct-25"."""
+    anio, mes = divmod(int(numero), 100)
+    return f"{MESES[mes - 1]}-{anio % 100:02d}"
@@ -28,14 +28,48 @@
 
 from __future__ import annotations
 
+import hashlib
+import json
+import os
 import re
+import sys
+import tempfile
+import threading
+import time
 import unicodedata
 import warnings
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache, partial
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Iterator, NamedTuple, Optional
 
+import numpy as np
 import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
+
+# esquema.py vive en la raíz del repo: lo comparte con app.py
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from esquema import (  # noqa: E402
+    FRECUENCIA_ANUAL,
+    FRECUENCIA_TRIMESTRAL,
+    VERSION_ESQUEMA,
+    DTYPE_PERIOD_NUM,
+    etiqueta_trimestral,
+    numero_trimestral,
+    sha256_archivo,
+    tipar_largo,
+)
+
+# exportar_excel escribe con xlsxwriter (formatos por columna, está en
+# requirements.txt). Si falta, usa openpyxl con formato celda por celda,
+# bastante más lento: exportar_excel avisa qué motor usó.
+try:
+    import xlsxwriter  # noqa: F401
+    MOTOR_EXCEL = "xlsxwriter"
+except ImportError:
+    MOTOR_EXCEL = "openpyxl"
 
 
 # ============================================================
@@ -52,72 +86,186 @@ PATRON_EMPRESAS = URL_BASE_ARGENTINA + "/provinciales_serie_empresas1_{version}.
 URL_VAB = "https://repositorio.cepal.org/server/api/core/bitstreams/539fcce5-8977-4061-a222-fbfd7358a35f/content"
 URL_EXPO = "https://www.indec.gob.ar/ftp/cuadros/economia/sh_opex_regiones_economicas_grubros_1993_2025.xls"
 
-def url_existe(url: str) -> bool:
+HEADERS_HTTP = {"User-Agent": "Mozilla/5.0"}
+
+_SESION_HTTP: Optional[requests.Session] = None
+
+
+def crear_sesion(max_conexiones: int = 8) -> requests.Session:
+    """
+    Sesión con pool de conexiones compartido entre hilos:
+    reutiliza TCP/TLS en lugar de abrir una conexión por sondeo.
+    """
+    sesion = requests.Session()
+    sesion.headers.update(HEADERS_HTTP)
+
+    adapter = HTTPAdapter(
+        pool_connections=max_conexiones,
+        pool_maxsize=max_conexiones,
+    )
+    sesion.mount("http://", adapter)
+    sesion.mount("https://", adapter)
+
+    return sesion
+
+
+def sesion_http() -> requests.Session:
+    global _SESION_HTTP
+
+    if _SESION_HTTP is None:
+        _SESION_HTTP = crear_sesion()
+
+    return _SESION_HTTP
+
+
+def metadatos_url(url: str, sesion: Optional[requests.Session] = None) -> Optional[dict]:
     """
-    Verifica si una URL existe.
+    Si la URL existe devuelve sus validadores HTTP ({"etag", "last_modified"});
+    si no existe, None.
     Primero intenta HEAD; si el servidor no lo permite, intenta GET liviano.
     """
-    headers = {"User-Agent": "Mozilla/5.0"}
+    sesion = sesion or sesion_http()
 
     try:
-        r = requests.head(url, headers=headers, timeout=20, allow_redirects=True)
-
-        if r.status_code == 200:
-            return True
+        r = sesion.head(url, timeout=20, allow_redirects=True)
 
         # Algunos servidores no aceptan HEAD correctamente
         if r.status_code in [403, 405]:
-            r = requests.get(url, headers=headers, timeout=30, stream=True)
-            return r.status_code == 200
+            r = sesion.get(url, timeout=30, stream=True)
+            r.close()
 
-        return False
+        if r.status_code != 200:
+            return None
+
+        return {
+            "etag": r.headers.get("ETag"),
+            "last_modified": r.headers.get("Last-Modified"),
+        }
 
     except requests.RequestException:
-        return False
+        return None
 
 
-def encontrar_ultima_url(
+def buscar_ultima_version(
     patron_url: str,
     version_min: int = 1,
     version_max: int = 30,
-) -> str:
+    sesion: Optional[requests.Session] = None,
+    max_hilos: int = 8,
+    fallos_seguidos: int = 5,
+) -> tuple[int, dict]:
     """
-    Busca la última versión disponible de una URL con patrón.
-
-    Ejemplo:
-        patron_url = ".../provinciales_serie_empresas1_{version}.xlsx"
+    Sondea las versiones en tandas de `max_hilos` en paralelo. Una vez que
+    encontró alguna versión, corta cuando hay `fallos_seguidos` versiones
+    consecutivas inexistentes por encima de la última válida.
 
-    Devuelve:
-        URL de la versión más alta que existe.
+    Devuelve (versión más alta que existe, validadores HTTP de esa URL).
     """
-    ultima_url_valida = None
+    sesion = sesion or sesion_http()
     ultima_version_valida = None
+    ultimos_metadatos: dict = {}
+
+    with ThreadPoolExecutor(max_workers=max_hilos) as pool:
+        version = version_min
+
+        while version <= version_max:
+            tanda = list(range(version, min(version + max_hilos, version_max + 1)))
+            urls = [patron_url.format(version=v) for v in tanda]
+
+            for v, url, meta in zip(tanda, urls, pool.map(lambda u: metadatos_url(u, sesion), urls)):
+                if meta is not None:
+                    ultima_version_valida = v
+                    ultimos_metadatos = meta
+                    print(f"Detectada versión disponible: {v} -> {url}")
 
-    for version in range(version_min, version_max + 1):
-        url = patron_url.format(version=version)
+            version = tanda[-1] + 1
 
-        if url_existe(url):
-            ultima_url_valida = url
-            ultima_version_valida = version
-            print(f"Detectada versión disponible: {version} -> {url}")
+            if ultima_version_valida is not None and tanda[-1] - ultima_version_valida >= fallos_seguidos:
+                break
 
-    if ultima_url_valida is None:
+    if ultima_version_valida is None:
         raise ValueError(f"No encontré ninguna URL válida para el patrón: {patron_url}")
 
     print(f"Última versión detectada: {ultima_version_valida}")
-    return ultima_url_valida
+    return ultima_version_valida, ultimos_metadatos
+
+
+def leer_descubrimiento() -> dict:
+    if not ARCHIVO_DESCUBRIMIENTO.exists():
+        return {}
+
+    try:
+        return json.loads(ARCHIVO_DESCUBRIMIENTO.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def guardar_descubrimiento(cache: dict) -> None:
+    ARCHIVO_DESCUBRIMIENTO.write_text(
+        json.dumps(cache, ensure_ascii=False, indent=2),
+        encoding="utf-8",
+    )
+
+
+def descubrir_url(
+    patron_url: str,
+    version_min: int = 1,
+    version_max: int = 30,
+    sesion: Optional[requests.Session] = None,
+) -> str:
+    """
+    URL de la última versión disponible de un patrón, por ejemplo
+    ".../provinciales_serie_empresas1_{version}.xlsx".
+
+    Recuerda en disco la última versión válida de cada patrón (con su
+    ETag / Last-Modified). Las corridas siguientes sólo sondean desde esa
+    versión hacia arriba; si la versión conocida desapareció, se vuelve a
+    buscar desde version_min.
+    """
+    previo = leer_descubrimiento().get(patron_url, {})
+    desde = max(version_min, int(previo.get("version", version_min)))
+
+    try:
+        version, meta = buscar_ultima_version(patron_url, desde, version_max, sesion)
+    except ValueError:
+        if desde == version_min:
+            raise
+        print(f"La versión conocida {desde} ya no está disponible; busco desde {version_min}")
+        version, meta = buscar_ultima_version(patron_url, version_min, version_max, sesion)
+
+    url = patron_url.format(version=version)
+
+    sin_cambios = previo.get("url") == url and any(
+        meta.get(k) and previo.get(k) == meta.get(k) for k in ["etag", "last_modified"]
+    )
+    if sin_cambios:
+        print(f"Sin cambios desde la última corrida: {url}")
+
+    with _LOCK_DESCUBRIMIENTO:
+        cache = leer_descubrimiento()
+        cache[patron_url] = {
+            "version": version,
+            "url": url,
+            "etag": meta.get("etag"),
+            "last_modified": meta.get("last_modified"),
+        }
+        guardar_descubrimiento(cache)
+
+    return url
+
+
+# La búsqueda de versiones se hace recién cuando una etapa necesita la URL:
+# importar el módulo no sale a la red.
+@lru_cache(maxsize=None)
+def url_empleo() -> str:
+    return descubrir_url(PATRON_EMPLEO, version_min=1, version_max=30)
+
+
+@lru_cache(maxsize=None)
+def url_empresas() -> str:
+    return descubrir_url(PATRON_EMPRESAS, version_min=1, version_max=30)
 
-URL_EMPLEO = encontrar_ultima_url(
-    PATRON_EMPLEO,
-    version_min=1,
-    version_max=30,
-)
 
-URL_EMPRESAS = encontrar_ultima_url(
-    PATRON_EMPRESAS,
-    version_min=1,
-    version_max=30,
-)
 # ============================================================
 # ARCHIVOS
 # ============================================================
@@ -130,7 +278,19 @@ ARCHIVO_EMPRESAS = DIR_DATA / "empresas_anual_latest.xlsx"
 ARCHIVO_VAB = DIR_DATA / "vab_cepal_provincias.xlsx"
 ARCHIVO_EXPO = DIR_DATA / "sh_opex_regiones_economicas_grubros_1993_2025.xls"
 
+# Última versión conocida de cada patrón de URL (ver descubrir_url)
+ARCHIVO_DESCUBRIMIENTO = DIR_DATA / "descubrimiento_urls.json"
+_LOCK_DESCUBRIMIENTO = threading.Lock()
+
+# URL, validadores HTTP, hash y tamaño de cada archivo descargado (ver descargar)
+ARCHIVO_MANIFEST_FUENTES = DIR_DATA / "manifest_fuentes.json"
+_LOCK_MANIFEST = threading.Lock()
+
+# Salida larga de cada etapa, en Parquet, con su clave al lado (ver correr_etapas)
+DIR_CACHE_ETAPAS = DIR_DATA / "cache_etapas"
+
 ARCHIVO_SALIDA = Path("data") / "base_provincias_dashboard.xlsx"
+DIR_SNAPSHOT = Path("data") / "snapshot"
 
 warnings.filterwarnings("ignore", category=UserWarning)
 
@@ -227,6 +387,24 @@ SECTORES_FILAS = {
     "Servicios comunitarios, sociales y personales n.c.p.": list(range(55, 59)),
 }
 
+# Ramas de la industria manufacturera (filas de Excel 12 a 35)
+FILAS_RAMAS_INDUSTRIA = list(range(12, 36))
+
+ANIOS_VAB = (2004, 2024)
+
+# Última fila de Excel que leen las hojas provinciales del VAB
+ULTIMA_FILA_VAB = max(
+    max(max(filas) for filas in SECTORES_FILAS.values()),
+    max(FILAS_RAMAS_INDUSTRIA),
+)
+
+# Pertenencia fila -> sector: MATRIZ_SECTORES[i, f - 1] = 1 si la fila de
+# Excel f suma en el i-ésimo sector de SECTORES_FILAS
+MATRIZ_SECTORES = np.zeros((len(SECTORES_FILAS), ULTIMA_FILA_VAB))
+
+for _i, _filas in enumerate(SECTORES_FILAS.values()):
+    MATRIZ_SECTORES[_i, [f - 1 for f in _filas]] = 1.0
+
 
 # ============================================================
 # FUNCIONES GENERALES
@@ -281,26 +459,118 @@ def provincia_desde_hoja(sheet_name: str) -> Optional[str]:
     return limpiar_provincia(sheet_name)
 
 
-def descargar(url: str, destino: Path, forzar: bool = False) -> None:
+def leer_manifest_fuentes() -> dict:
+    if not ARCHIVO_MANIFEST_FUENTES.exists():
+        return {}
+
+    try:
+        return json.loads(ARCHIVO_MANIFEST_FUENTES.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def registrar_en_manifest(destino: Path, datos: dict) -> None:
+    with _LOCK_MANIFEST:
+        manifest = leer_manifest_fuentes()
+        manifest[destino.name] = datos
+
+        ARCHIVO_MANIFEST_FUENTES.write_text(
+            json.dumps(manifest, ensure_ascii=False, indent=2),
+            encoding="utf-8",
+        )
+
+
+def archivo_intacto(destino: Path, previo: dict) -> bool:
+    """
+    True si `destino` tiene el tamaño y el sha256 que se registraron en el
+    manifest al descargarlo (un archivo truncado o editado no lo cumple).
     """
-    Descarga un archivo.
+    if not destino.exists() or not previo.get("sha256"):
+        return False
+
+    if destino.stat().st_size != previo.get("bytes"):
+        return False
+
+    return sha256_archivo(destino) == previo["sha256"]
+
 
-    Si forzar=False y el archivo ya existe, usa el archivo local.
-    Si forzar=True, lo vuelve a descargar aunque exista.
+def descargar(url: str, destino: Path, forzar: bool = False) -> bool:
     """
-    if destino.exists() and not forzar:
-        print(f"Uso archivo local: {destino}")
-        return
+    Descarga un archivo si cambió en el servidor.
+
+    Si el archivo local ya se bajó de esta misma URL y sigue intacto
+    (mismo tamaño y sha256 que en el manifest), hace un pedido condicional
+    (If-None-Match / If-Modified-Since) con los validadores guardados: si
+    no cambió, el servidor responde 304 y se usa el archivo local. Si el
+    archivo local no coincide con el manifest, o forzar=True, lo vuelve a
+    descargar entero.
+
+    El cuerpo se escribe por bloques en un temporal y se renombra al final,
+    así nunca queda entero en memoria ni un archivo a medio escribir.
+    Devuelve True si el archivo local cambió.
+    """
+    previo = leer_manifest_fuentes().get(destino.name, {})
+    headers = {}
+
+    intacto = archivo_intacto(destino, previo)
+    if destino.exists() and previo.get("url") == url and not intacto:
+        print(f"El archivo local no coincide con el manifest, descarga completa: {destino}")
+
+    if intacto and not forzar and previo.get("url") == url:
+        if previo.get("etag"):
+            headers["If-None-Match"] = previo["etag"]
+        if previo.get("last_modified"):
+            headers["If-Modified-Since"] = previo["last_modified"]
 
     print(f"Descargando: {url}")
 
-    headers = {"User-Agent": "Mozilla/5.0"}
-    r = requests.get(url, headers=headers, timeout=120)
-    r.raise_for_status()
+    try:
+        with sesion_http().get(url, headers=headers, timeout=120, stream=True) as r:
+            if r.status_code == 304:
+                print(f"Sin cambios, uso archivo local: {destino}")
+                return False
 
-    destino.write_bytes(r.content)
+            r.raise_for_status()
 
-    print(f"Archivo descargado: {destino}")
+            h = hashlib.sha256()
+            tamanio = 0
+            fd, tmp = tempfile.mkstemp(dir=destino.parent, prefix=destino.name, suffix=".part")
+
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    for bloque in r.iter_content(chunk_size=1 << 20):
+                        f.write(bloque)
+                        h.update(bloque)
+                        tamanio += len(bloque)
+
+                os.replace(tmp, destino)
+            except BaseException:
+                Path(tmp).unlink(missing_ok=True)
+                raise
+
+            etag = r.headers.get("ETag")
+            last_modified = r.headers.get("Last-Modified")
+
+    except requests.RequestException as e:
+        if destino.exists():
+            print(f"No pude descargar ({e}); uso archivo local: {destino}")
+            return False
+        raise
+
+    sha256 = h.hexdigest()
+
+    registrar_en_manifest(destino, {
+        "url": url,
+        "etag": etag,
+        "last_modified": last_modified,
+        "sha256": sha256,
+        "bytes": tamanio,
+    })
+
+    cambio = not intacto or sha256 != previo.get("sha256")
+    print(f"Archivo descargado: {destino} ({tamanio:,} bytes{'' if cambio else ', sin cambios de contenido'})")
+
+    return cambio
 
 
 def extraer_anio(valor: object, anio_min: int, anio_max: int) -> Optional[int]:
@@ -325,7 +595,12 @@ def extraer_anio(valor: object, anio_min: int, anio_max: int) -> Optional[int]:
     return None
 
 
-def pivotear_anual(base_larga: pd.DataFrame, variables_orden: list[str]) -> pd.DataFrame:
+def pivotear_largo(base_larga: pd.DataFrame) -> pd.DataFrame:
+    """
+    provincia | variable | un período por columna, en orden de período.
+    provincia y variable salen como texto aunque la base larga traiga
+    categorías; las columnas de períodos quedan con el número del período.
+    """
     out = (
         base_larga
         .pivot_table(
@@ -333,18 +608,21 @@ def pivotear_anual(base_larga: pd.DataFrame, variables_orden: list[str]) -> pd.D
             columns="periodo",
             values="valor",
             aggfunc="sum",
+            observed=True,
         )
+        .sort_index(axis=1)
         .reset_index()
     )
 
-    out.columns.name = None
+    out.columns = ["provincia", "variable"] + [int(c) for c in out.columns[2:]]
+    out["provincia"] = out["provincia"].astype(str)
+    out["variable"] = out["variable"].astype(str)
 
-    columnas_periodos = sorted(
-        [c for c in out.columns if c not in ["provincia", "variable"]],
-        key=lambda x: int(x),
-    )
+    return out
 
-    out = out[["provincia", "variable"] + columnas_periodos]
+
+def pivotear_anual(base_larga: pd.DataFrame, variables_orden: list[str]) -> pd.DataFrame:
+    out = pivotear_largo(base_larga)
 
     orden_prov = {p: i for i, p in enumerate(ORDEN_PROVINCIAS)}
     orden_var = {v: i for i, v in enumerate(variables_orden)}
@@ -361,41 +639,11 @@ def pivotear_anual(base_larga: pd.DataFrame, variables_orden: list[str]) -> pd.D
     return out
 
 
-def ordenar_trimestres(cols: list[str]) -> list[str]:
-    orden_q = {"I": 1, "II": 2, "III": 3, "IV": 4}
-
-    def key(c: str):
-        m = re.match(r"^(I|II|III|IV)-(\d{2})$", str(c))
-        if not m:
-            return (9999, 9)
-
-        yy = int(m.group(2))
-        year = 1900 + yy if yy >= 90 else 2000 + yy
-
-        return (year, orden_q[m.group(1)])
-
-    return sorted(cols, key=key)
-
-
 def pivotear_trim(base_larga: pd.DataFrame) -> pd.DataFrame:
-    out = (
-        base_larga
-        .pivot_table(
-            index=["provincia", "variable"],
-            columns="periodo",
-            values="valor",
-            aggfunc="sum",
-        )
-        .reset_index()
-    )
+    out = pivotear_largo(base_larga)
 
-    out.columns.name = None
-
-    columnas_periodos = ordenar_trimestres(
-        [c for c in out.columns if c not in ["provincia", "variable"]]
-    )
-
-    out = out[["provincia", "variable"] + columnas_periodos]
+    # Los encabezados trimestrales del Excel van como etiqueta ("I-96")
+    out.columns = ["provincia", "variable"] + [etiqueta_trimestral(c) for c in out.columns[2:]]
 
     orden_prov = {p: i for i, p in enumerate(ORDEN_PROVINCIAS)}
     orden_var = {"empleo_indus": 0, "empleo": 1}
@@ -413,103 +661,214 @@ def pivotear_trim(base_larga: pd.DataFrame) -> pd.DataFrame:
 
 
 # ============================================================
-# EMPLEO TRIMESTRAL
+# FORMATO LARGO
 # ============================================================
 
-ROMANOS = {"1": "I", "2": "II", "3": "III", "4": "IV"}
+COLUMNAS_LARGO = ["provincia", "variable", "periodo", "valor"]
 
 
-def etiqueta_trimestre(valor: object) -> Optional[str]:
-    if valor is None or pd.isna(valor):
-        return None
-
-    if isinstance(valor, pd.Timestamp):
-        q = (valor.month - 1) // 3 + 1
-        return f"{ROMANOS[str(q)]}-{str(valor.year)[-2:]}"
+class AcumuladorLargo:
+    """
+    Junta la salida larga de una etapa (provincia | variable | periodo |
+    valor) por lotes de arrays y la arma una sola vez con a_frame().
 
-    s = str(valor).strip().upper()
-    s = s.replace("º", "°")
-    s = s.replace(".", "")
-    s = re.sub(r"\s+", " ", s)
+    provincia, variable y periodo se guardan como códigos int32 contra una
+    tabla de categorías por columna; valor queda con el dtype del lote.
+    Así cada celda cuesta unos bytes en vez de un dict de Python.
 
-    # 1°TRIM 1996 / 2 TRIM 1996 / 3 TRIMESTRE 1996
-    m = re.search(r"\b([1-4])\s*°?\s*(?:TRIM|TRIMESTRE)\s*(19\d{2}|20\d{2})\b", s)
-    if m:
-        return f"{ROMANOS[m.group(1)]}-{m.group(2)[-2:]}"
+    periodo es el número del período como en esquema.py (año, o año * 10 +
+    trimestre). a_frame() devuelve provincia y variable como Categorical y
+    periodo como int32, sin pasar por arrays de objetos.
+    """
 
-    # I-96 / II-1996
-    m = re.match(r"^(I|II|III|IV)[-_/ ]?(\d{2}|\d{4})$", s)
-    if m:
-        return f"{m.group(1)}-{m.group(2)[-2:]}"
+    def __init__(self) -> None:
+        self._categorias: dict[str, dict[object, int]] = {
+            "provincia": {},
+            "variable": {},
+            "periodo": {},
+        }
+        self._lotes: dict[str, list[np.ndarray]] = {c: [] for c in COLUMNAS_LARGO}
+
+    def _codificar(self, columna: str, valores: object, n: int) -> np.ndarray:
+        """
+        Códigos de `valores` (un escalar, que se repite n veces, o una
+        secuencia de largo n) en la tabla de categorías de la columna.
+        """
+        categorias = self._categorias[columna]
+        valores = np.asarray(valores)
+
+        if valores.ndim == 0:
+            codigo = categorias.setdefault(valores.item(), len(categorias))
+            return np.full(n, codigo, dtype=np.int32)
+
+        unicos, inversa = np.unique(valores, return_inverse=True)
+        codigos = np.array(
+            [categorias.setdefault(u, len(categorias)) for u in unicos.tolist()],
+            dtype=np.int32,
+        )
 
-    return None
+        return codigos[inversa.ravel()]
+
+    def agregar_bloque(
+        self,
+        bloque: np.ndarray,
+        filas: dict[str, object],
+        columnas: dict[str, object],
+    ) -> None:
+        """
+        Agrega un bloque de valores. `filas` y `columnas` dicen, para cada
+        una de provincia / variable / periodo, el valor de cada fila o de
+        cada columna del bloque (o un escalar común a todo el bloque).
+        """
+        bloque = np.asarray(bloque)
+        n_filas, n_columnas = bloque.shape
+
+        for columna, valores in filas.items():
+            codigos = self._codificar(columna, valores, n_filas)
+            self._lotes[columna].append(np.repeat(codigos, n_columnas))
+
+        for columna, valores in columnas.items():
+            codigos = self._codificar(columna, valores, n_columnas)
+            self._lotes[columna].append(np.tile(codigos, n_filas))
+
+        self._lotes["valor"].append(bloque.ravel())
+
+    def _codigos(self, columna: str) -> np.ndarray:
+        lotes = self._lotes[columna]
+        return np.concatenate(lotes) if lotes else np.array([], dtype=np.int32)
+
+    def a_frame(self) -> pd.DataFrame:
+        datos = {
+            columna: pd.Categorical.from_codes(
+                self._codigos(columna),
+                categories=list(self._categorias[columna]),
+            )
+            for columna in ["provincia", "variable"]
+        }
 
+        periodos = np.array(list(self._categorias["periodo"]), dtype=DTYPE_PERIOD_NUM)
+        datos["periodo"] = periodos[self._codigos("periodo")]
 
-def detectar_columnas_trimestres(df: pd.DataFrame) -> dict[int, str]:
-    mejor = {}
+        lotes_valor = self._lotes["valor"]
+        datos["valor"] = np.concatenate(lotes_valor) if lotes_valor else np.array([], dtype="float64")
 
-    for fila_idx in range(min(20, len(df))):
-        candidatos = {}
+        return pd.DataFrame(datos, columns=COLUMNAS_LARGO)
 
-        for col_idx, valor in enumerate(df.iloc[fila_idx].tolist()):
-            etiqueta = etiqueta_trimestre(valor)
-            if etiqueta is not None:
-                candidatos[col_idx] = etiqueta
 
-        if len(candidatos) > len(mejor):
-            mejor = candidatos
+# ============================================================
+# EXTRACCIÓN DE HOJAS PROVINCIALES
+# ============================================================
 
-    if not mejor:
-        raise ValueError("No pude detectar trimestres.")
+class ExtraccionHojas(NamedTuple):
+    """
+    Qué leer de cada hoja provincial de un libro: las filas fijas de datos
+    (variable -> fila de Excel, 1-based) y cómo detectar las columnas de
+    períodos dentro de las primeras `filas_encabezado` filas.
+    """
+    fuente: str
+    filas: dict[str, int]
+    detectar_columnas: Callable[[pd.DataFrame], dict[int, object]]
+    filas_encabezado: int = 25
 
-    return mejor
 
+def extraer_bloques(
+    archivo: Path,
+    spec: ExtraccionHojas,
+) -> Iterator[tuple[str, list, np.ndarray]]:
+    """
+    Recorre las hojas provinciales del libro y devuelve, por hoja,
+    (provincia, períodos, bloque), con bloque[i, j] = valor de la i-ésima
+    variable de spec.filas en el j-ésimo período.
 
-def procesar_empleo_trim() -> pd.DataFrame:
-    descargar(URL_EMPLEO, ARCHIVO_EMPLEO)
+    Cada hoja se lee sólo hasta la última fila necesaria y el bloque sale
+    de un único corte por índices, sin recorrer celdas en Python.
+    """
+    filas_idx = [f - 1 for f in spec.filas.values()]
+    ultima_fila = max(max(filas_idx) + 1, spec.filas_encabezado)
 
-    filas_variables = {
-        "empleo_indus": 15,
-        "empleo": 76,
-    }
+    with pd.ExcelFile(archivo) as xls:
+        for sheet in xls.sheet_names:
+            provincia = provincia_desde_hoja(sheet)
 
-    xls = pd.ExcelFile(ARCHIVO_EMPLEO)
-    filas = []
+            if provincia is None:
+                print(f"Salteo hoja {spec.fuente} no provincial: {sheet}")
+                continue
 
-    for sheet in xls.sheet_names:
-        provincia = provincia_desde_hoja(sheet)
+            print(f"Procesando {spec.fuente}: {sheet} -> {provincia}")
 
-        if provincia is None:
-            print(f"Salteo hoja empleo no provincial: {sheet}")
-            continue
+            df = xls.parse(sheet, header=None, nrows=ultima_fila)
+            columnas = spec.detectar_columnas(df.iloc[: spec.filas_encabezado])
 
-        print(f"Procesando empleo: {sheet} -> {provincia}")
+            celdas = df.to_numpy()[np.ix_(filas_idx, list(columnas))]
+            bloque = pd.to_numeric(celdas.ravel(), errors="coerce").reshape(celdas.shape)
 
-        df = pd.read_excel(ARCHIVO_EMPLEO, sheet_name=sheet, header=None)
-        columnas = detectar_columnas_trimestres(df)
+            yield provincia, list(columnas.values()), bloque
 
-        for variable, fila_excel in filas_variables.items():
-            fila_idx = fila_excel - 1
 
-            for col_idx, periodo in columnas.items():
-                valor = pd.to_numeric(df.iat[fila_idx, col_idx], errors="coerce")
+def leer_hojas_largo(archivo: Path, spec: ExtraccionHojas) -> pd.DataFrame:
+    """
+    Formato largo (provincia | variable | periodo | valor) de todas las
+    hojas provinciales. Las hojas de una misma provincia se suman
+    (Buenos Aires = Partidos de GBA + Resto de Buenos Aires).
+    """
+    acumulador = AcumuladorLargo()
 
-                filas.append({
-                    "provincia": provincia,
-                    "variable": variable,
-                    "periodo": periodo,
-                    "valor": valor,
-                })
+    for provincia, periodos, bloque in extraer_bloques(archivo, spec):
+        acumulador.agregar_bloque(
+            bloque,
+            filas={"provincia": provincia, "variable": list(spec.filas)},
+            columnas={"periodo": periodos},
+        )
 
-    base = pd.DataFrame(filas)
+    base = acumulador.a_frame()
 
-    # Buenos Aires suma Partidos de GBA + Resto de Buenos Aires
-    base = (
-        base.groupby(["provincia", "variable", "periodo"], as_index=False)["valor"]
+    return (
+        base.groupby(["provincia", "variable", "periodo"], as_index=False, observed=True)["valor"]
         .sum(min_count=1)
     )
 
-    return base
+
+# ============================================================
+# EMPLEO TRIMESTRAL
+# ============================================================
+
+def detectar_columnas_trimestres(df: pd.DataFrame) -> dict[int, int]:
+    """Columna -> número de trimestre (año * 10 + q) de la fila con más trimestres."""
+    mejor = {}
+
+    for fila_idx in range(min(20, len(df))):
+        candidatos = {}
+
+        for col_idx, valor in enumerate(df.iloc[fila_idx].tolist()):
+            numero = numero_trimestral(valor)
+            if numero is not None:
+                candidatos[col_idx] = numero
+
+        if len(candidatos) > len(mejor):
+            mejor = candidatos
+
+    if not mejor:
+        raise ValueError("No pude detectar trimestres.")
+
+    return mejor
+
+
+# variable -> fila de Excel (1-based) en cada hoja provincial
+FILAS_EMPLEO = {
+    "empleo_indus": 15,
+    "empleo": 76,
+}
+
+EXTRACCION_EMPLEO = ExtraccionHojas(
+    fuente="empleo",
+    filas=FILAS_EMPLEO,
+    detectar_columnas=detectar_columnas_trimestres,
+    filas_encabezado=20,
+)
+
+
+def leer_empleo_trim(archivo: Path) -> pd.DataFrame:
+    return leer_hojas_largo(archivo, EXTRACCION_EMPLEO)
 
 
 # ============================================================
@@ -554,157 +913,163 @@ def detectar_columnas_anios_generico(
     return mejor
 
 
-def procesar_empresas_anual() -> pd.DataFrame:
-    descargar(URL_EMPRESAS, ARCHIVO_EMPRESAS)
-
-    filas_variables = {
-        "empresas_indus": 15,
-        "empresas": 76,
-    }
-
-    xls = pd.ExcelFile(ARCHIVO_EMPRESAS)
-    filas = []
-
-    for sheet in xls.sheet_names:
-        provincia = provincia_desde_hoja(sheet)
-
-        if provincia is None:
-            print(f"Salteo hoja empresas no provincial: {sheet}")
-            continue
-
-        print(f"Procesando empresas: {sheet} -> {provincia}")
+# variable -> fila de Excel (1-based) en cada hoja provincial
+FILAS_EMPRESAS = {
+    "empresas_indus": 15,
+    "empresas": 76,
+}
 
-        df = pd.read_excel(ARCHIVO_EMPRESAS, sheet_name=sheet, header=None)
-        columnas = detectar_columnas_anios_generico(df, 1996, 2024)
+ANIOS_EMPRESAS = (1996, 2024)
 
-        for variable, fila_excel in filas_variables.items():
-            fila_idx = fila_excel - 1
+EXTRACCION_EMPRESAS = ExtraccionHojas(
+    fuente="empresas",
+    filas=FILAS_EMPRESAS,
+    detectar_columnas=partial(
+        detectar_columnas_anios_generico,
+        anio_min=ANIOS_EMPRESAS[0],
+        anio_max=ANIOS_EMPRESAS[1],
+    ),
+)
 
-            for col_idx, anio in columnas.items():
-                valor = pd.to_numeric(df.iat[fila_idx, col_idx], errors="coerce")
 
-                filas.append({
-                    "provincia": provincia,
-                    "variable": variable,
-                    "periodo": anio,
-                    "valor": valor,
-                })
-
-    base = pd.DataFrame(filas)
-
-    base = (
-        base.groupby(["provincia", "variable", "periodo"], as_index=False)["valor"]
-        .sum(min_count=1)
-    )
-
-    return base
+def leer_empresas_anual(archivo: Path) -> pd.DataFrame:
+    return leer_hojas_largo(archivo, EXTRACCION_EMPRESAS)
 
 
 # ============================================================
 # VAB TOTAL, VAB SECTORIAL Y RAMAS INDUSTRIALES
 # ============================================================
 
-def procesar_vab_total() -> pd.DataFrame:
-    descargar(URL_VAB, ARCHIVO_VAB)
+HOJA_VAB_TOTAL = "VABpb"
 
-    df = pd.read_excel(ARCHIVO_VAB, sheet_name="VABpb", header=None)
-
-    columnas = detectar_columnas_anios_generico(
-        df,
-        anio_min=2004,
-        anio_max=2024,
-        fila_fija_excel=6,
-    )
-
-    filas = []
-
-    # Columna B = provincia; desde fila 7
-    for fila_idx in range(6, len(df)):
-        provincia = limpiar_provincia(df.iat[fila_idx, 1])
-
-        if provincia not in ORDEN_PROVINCIAS:
-            continue
-
-        for col_idx, anio in columnas.items():
-            valor = pd.to_numeric(df.iat[fila_idx, col_idx], errors="coerce")
-
-            filas.append({
-                "provincia": provincia,
-                "variable": "vab",
-                "periodo": anio,
-                "valor": valor,
-            })
-
-    return pd.DataFrame(filas)
 
+class LibroVAB:
+    """
+    El libro del VAB de CEPAL abierto una sola vez. Sirve el VAB total
+    (hoja VABpb) y el VAB por sector y por rama (hojas provinciales)
+    desde las mismas hojas en memoria: cada hoja se parsea a lo sumo una
+    vez y sus columnas de años se detectan una sola vez.
 
-def procesar_vab_sectorial_y_ramas() -> tuple[pd.DataFrame, pd.DataFrame]:
-    descargar(URL_VAB, ARCHIVO_VAB)
+    Usar como context manager para cerrar el libro al terminar.
+    """
 
-    xls = pd.ExcelFile(ARCHIVO_VAB)
+    def __init__(self, archivo: Path):
+        self.archivo = archivo
+        self._xls = pd.ExcelFile(archivo)
+        self._hojas: dict[str, pd.DataFrame] = {}
+        self._columnas: dict[str, dict[int, int]] = {}
+
+    def __enter__(self) -> "LibroVAB":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._xls.close()
+
+    @property
+    def sheet_names(self) -> list[str]:
+        return self._xls.sheet_names
+
+    def hoja(self, sheet: str) -> pd.DataFrame:
+        if sheet not in self._hojas:
+            # Las hojas provinciales se leen sólo hasta la última fila de sectores
+            nrows = None if sheet == HOJA_VAB_TOTAL else ULTIMA_FILA_VAB
+            self._hojas[sheet] = self._xls.parse(sheet, header=None, nrows=nrows)
+
+        return self._hojas[sheet]
+
+    def columnas(self, sheet: str) -> dict[int, int]:
+        if sheet not in self._columnas:
+            self._columnas[sheet] = detectar_columnas_anios_generico(
+                self.hoja(sheet),
+                anio_min=ANIOS_VAB[0],
+                anio_max=ANIOS_VAB[1],
+                fila_fija_excel=6,
+            )
+
+        return self._columnas[sheet]
+
+    def total(self) -> pd.DataFrame:
+        df = self.hoja(HOJA_VAB_TOTAL)
+        columnas = self.columnas(HOJA_VAB_TOTAL)
+
+        # Columna B = provincia; desde fila 7
+        provincias = df.iloc[6:, 1].map(limpiar_provincia)
+        provincias = provincias[provincias.isin(ORDEN_PROVINCIAS)]
+
+        filas_idx = provincias.index.to_numpy()
+        celdas = df.to_numpy()[np.ix_(filas_idx, list(columnas))]
+        bloque = pd.to_numeric(celdas.ravel(), errors="coerce").reshape(celdas.shape)
+
+        acumulador = AcumuladorLargo()
+        acumulador.agregar_bloque(
+            bloque,
+            filas={"provincia": provincias.tolist(), "variable": "vab"},
+            columnas={"periodo": list(columnas.values())},
+        )
 
-    filas_sector = []
-    filas_ramas_industria = []
+        return acumulador.a_frame()
 
-    for sheet in xls.sheet_names:
-        provincia = provincia_desde_hoja(sheet)
+    def bloque(self, sheet: str) -> np.ndarray:
+        """
+        Valores numéricos de la hoja provincial como matriz fila x año
+        (filas de Excel 1..ULTIMA_FILA_VAB, columnas de self.columnas).
+        """
+        celdas = self.hoja(sheet).to_numpy()[:ULTIMA_FILA_VAB, list(self.columnas(sheet))]
 
-        if provincia is None:
-            print(f"Salteo hoja VAB no provincial: {sheet}")
-            continue
+        return pd.to_numeric(celdas.ravel(), errors="coerce").astype("float64").reshape(celdas.shape)
 
-        print(f"Procesando VAB sectorial: {sheet} -> {provincia}")
+    def sectorial_y_ramas(self) -> tuple[pd.DataFrame, pd.DataFrame]:
+        sectores = list(SECTORES_FILAS)
+        filas_ramas_idx = [f - 1 for f in FILAS_RAMAS_INDUSTRIA]
 
-        df = pd.read_excel(ARCHIVO_VAB, sheet_name=sheet, header=None)
+        acumulador_sector = AcumuladorLargo()
+        acumulador_ramas = AcumuladorLargo()
 
-        columnas = detectar_columnas_anios_generico(
-            df,
-            anio_min=2004,
-            anio_max=2024,
-            fila_fija_excel=6,
-        )
+        for sheet in self.sheet_names:
+            provincia = provincia_desde_hoja(sheet)
 
-        # Sectores agregados
-        for sector, filas_excel in SECTORES_FILAS.items():
-            filas_idx = [f - 1 for f in filas_excel]
+            if provincia is None:
+                print(f"Salteo hoja VAB no provincial: {sheet}")
+                continue
 
-            for col_idx, anio in columnas.items():
-                valores = pd.to_numeric(df.iloc[filas_idx, col_idx], errors="coerce")
-                valor = valores.sum(skipna=True)
+            print(f"Procesando VAB sectorial: {sheet} -> {provincia}")
 
-                filas_sector.append({
-                    "provincia": provincia,
-                    "variable": sector,
-                    "periodo": anio,
-                    "valor": valor,
-                })
+            anios = list(self.columnas(sheet).values())
+            bloque = self.bloque(sheet)
 
-        # Ramas industriales: filas 12 a 35
-        for fila_excel in range(12, 36):
-            fila_idx = fila_excel - 1
+            # Sectores agregados: suma de sus filas (vacíos cuentan como 0)
+            por_sector = MATRIZ_SECTORES @ np.nan_to_num(bloque, nan=0.0)
 
-            rama_raw = df.iat[fila_idx, 1]
-            if rama_raw is None or pd.isna(rama_raw):
-                continue
+            acumulador_sector.agregar_bloque(
+                por_sector,
+                filas={"provincia": provincia, "variable": sectores},
+                columnas={"periodo": anios},
+            )
 
-            rama = str(rama_raw).strip()
-            if rama == "":
-                continue
+            # Ramas industriales: filas 12 a 35, salvo las que no tienen nombre
+            nombres = self.hoja(sheet).iloc[filas_ramas_idx, 1]
+            nombres = nombres.where(nombres.notna(), "").astype(str).str.strip().to_numpy()
+            con_nombre = nombres != ""
 
-            for col_idx, anio in columnas.items():
-                valor = pd.to_numeric(df.iat[fila_idx, col_idx], errors="coerce")
+            acumulador_ramas.agregar_bloque(
+                bloque[filas_ramas_idx][con_nombre],
+                filas={"provincia": provincia, "variable": nombres[con_nombre]},
+                columnas={"periodo": anios},
+            )
 
-                filas_ramas_industria.append({
-                    "provincia": provincia,
-                    "variable": rama,
-                    "periodo": anio,
-                    "valor": valor,
-                })
+        return acumulador_sector.a_frame(), acumulador_ramas.a_frame()
 
-    base_sector = pd.DataFrame(filas_sector)
-    base_ramas = pd.DataFrame(filas_ramas_industria)
 
-    return base_sector, base_ramas
+def leer_vab(archivo: Path) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """
+    (VAB total, VAB por sector, VAB por rama industrial) en formato largo,
+    leyendo el libro una sola vez.
+    """
+    with LibroVAB(archivo) as libro:
+        return (libro.total(), *libro.sectorial_y_ramas())
 
 
 def procesar_vab_indus_para_anual(base_sectorial_larga: pd.DataFrame) -> pd.DataFrame:
@@ -712,7 +1077,7 @@ def procesar_vab_indus_para_anual(base_sectorial_larga: pd.DataFrame) -> pd.Data
         base_sectorial_larga["variable"] == "Industria manufacturera"
     ].copy()
 
-    out["variable"] = "vab_indus"
+    out["variable"] = pd.Categorical(["vab_indus"] * len(out))
 
     return out
 
@@ -809,66 +1174,42 @@ def armar_mapa_columnas_expo(df: pd.DataFrame) -> pd.DataFrame:
     return mapa
 
 
-def procesar_expo_anual() -> pd.DataFrame:
-    descargar(URL_EXPO, ARCHIVO_EXPO)
-
-    xls = pd.ExcelFile(ARCHIVO_EXPO, engine="xlrd")
-    bases = []
+def leer_expo_anual(archivo: Path) -> pd.DataFrame:
+    xls = pd.ExcelFile(archivo, engine="xlrd")
+    acumulador = AcumuladorLargo()
 
     for sheet in xls.sheet_names:
         print(f"Procesando expo: {sheet}")
 
-        df = pd.read_excel(
-            ARCHIVO_EXPO,
-            sheet_name=sheet,
-            header=None,
-            engine="xlrd",
-        )
+        df = xls.parse(sheet, header=None)
 
         col_prov = detectar_columna_provincia_expo(df)
         mapa = armar_mapa_columnas_expo(df)
 
-        datos = df.iloc[6:].copy()
-        datos["provincia"] = datos.iloc[:, col_prov].apply(limpiar_provincia)
-        datos = datos[datos["provincia"].isin(ORDEN_PROVINCIAS)].copy()
+        provincias = df.iloc[6:, col_prov].map(limpiar_provincia)
+        provincias = provincias[provincias.isin(ORDEN_PROVINCIAS)]
 
-        if datos.empty:
+        if provincias.empty:
             continue
 
-        value_cols = mapa["col_idx"].tolist()
-        base = datos[["provincia"] + value_cols].copy()
+        celdas = df.to_numpy()[np.ix_(provincias.index.to_numpy(), mapa["col_idx"].to_numpy())]
+        valores = np.array([limpiar_valor_expo(v) for v in celdas.ravel()], dtype="float64")
 
-        rename_cols = {
-            row.col_idx: f"c_{i}"
-            for i, row in mapa.reset_index(drop=True).iterrows()
-        }
-
-        base = base.rename(columns=rename_cols)
-
-        mapa = mapa.reset_index(drop=True)
-        mapa["col_tmp"] = [f"c_{i}" for i in range(len(mapa))]
-
-        largo = base.melt(
-            id_vars=["provincia"],
-            value_vars=mapa["col_tmp"].tolist(),
-            var_name="col_tmp",
-            value_name="valor",
-        )
-
-        largo = largo.merge(
-            mapa[["col_tmp", "variable", "periodo"]],
-            on="col_tmp",
-            how="left",
+        acumulador.agregar_bloque(
+            valores.reshape(celdas.shape),
+            filas={"provincia": provincias.tolist()},
+            columnas={
+                "variable": mapa["variable"].tolist(),
+                "periodo": mapa["periodo"].tolist(),
+            },
         )
 
-        largo["valor"] = largo["valor"].apply(limpiar_valor_expo)
+    xls.close()
 
-        bases.append(largo[["provincia", "variable", "periodo", "valor"]])
-
-    base = pd.concat(bases, ignore_index=True)
+    base = acumulador.a_frame()
 
     base = (
-        base.groupby(["provincia", "variable", "periodo"], as_index=False)["valor"]
+        base.groupby(["provincia", "variable", "periodo"], as_index=False, observed=True)["valor"]
         .sum(min_count=1)
     )
 
@@ -878,13 +1219,16 @@ def procesar_expo_anual() -> pd.DataFrame:
     # Variable solicitada: expo_moa_moi = MOA + MOI
     expo_moa_moi = (
         base[base["variable"].isin(["expo_moa", "expo_moi"])]
-        .groupby(["provincia", "periodo"], as_index=False)["valor"]
+        .groupby(["provincia", "periodo"], as_index=False, observed=True)["valor"]
         .sum(min_count=1)
     )
     expo_moa_moi["variable"] = "expo_moa_moi"
-    expo_moa_moi = expo_moa_moi[["provincia", "variable", "periodo", "valor"]]
+    expo_moa_moi = expo_moa_moi[COLUMNAS_LARGO]
+
+    out = pd.concat([expo_total, expo_moa_moi], ignore_index=True)
+    out["variable"] = out["variable"].astype(str).astype("category")
 
-    return pd.concat([expo_total, expo_moa_moi], ignore_index=True)
+    return out
 
 
 # ============================================================
@@ -897,6 +1241,10 @@ def escribir_hoja_ancha(
     sheet_name: str,
     width_variable: int = 34,
 ) -> None:
+    if writer.engine == "xlsxwriter":
+        escribir_hoja_ancha_xlsxwriter(writer, df, sheet_name, width_variable)
+        return
+
     df.to_excel(writer, sheet_name=sheet_name, index=False)
 
     ws = writer.book[sheet_name]
@@ -925,6 +1273,37 @@ def escribir_hoja_ancha(
             ws.cell(row=row, column=col).number_format = "#,##0.0"
 
 
+def escribir_hoja_ancha_xlsxwriter(
+    writer: pd.ExcelWriter,
+    df: pd.DataFrame,
+    sheet_name: str,
+    width_variable: int = 34,
+) -> None:
+    """
+    Misma hoja que escribir_hoja_ancha, pero los formatos y anchos se
+    aplican por columna (set_column) en vez de celda por celda.
+    """
+    # En hojas anuales, los encabezados deben quedar numéricos.
+    df = df.rename(columns=lambda c: int(c) if isinstance(c, str) and c.isdigit() else c)
+    df.to_excel(writer, sheet_name=sheet_name, index=False)
+
+    ws = writer.sheets[sheet_name]
+    formato_valor = writer.book.add_format({"num_format": "#,##0.0"})
+    formato_anio = writer.book.add_format({"num_format": "0"})
+    formato_texto = writer.book.add_format()
+
+    ws.freeze_panes(1, 2)
+    ws.autofilter(0, 0, len(df), len(df.columns) - 1)
+
+    ws.set_column(0, 0, 24)
+    ws.set_column(1, 1, width_variable)
+    ws.set_column(2, len(df.columns) - 1, 12, formato_valor)
+
+    # El formato de columna no debe alcanzar a los encabezados
+    for col_idx, columna in enumerate(df.columns[2:], start=2):
+        ws.write(0, col_idx, columna, formato_anio if isinstance(columna, int) else formato_texto)
+
+
 def exportar_excel(
     base_anual: pd.DataFrame,
     base_trim: pd.DataFrame,
@@ -932,37 +1311,260 @@ def exportar_excel(
     vab_ramas: pd.DataFrame,
 ) -> None:
 
-    with pd.ExcelWriter(ARCHIVO_SALIDA, engine="openpyxl") as writer:
+    if MOTOR_EXCEL == "xlsxwriter":
+        print(f"Motor Excel: {MOTOR_EXCEL}")
+    else:
+        print(f"Motor Excel: {MOTOR_EXCEL} (xlsxwriter no está instalado; el formato celda por celda es más lento)")
+
+    with pd.ExcelWriter(ARCHIVO_SALIDA, engine=MOTOR_EXCEL) as writer:
         escribir_hoja_ancha(writer, base_anual, "anual", width_variable=24)
         escribir_hoja_ancha(writer, base_trim, "trim", width_variable=18)
         escribir_hoja_ancha(writer, vab_sector, "vabporsector", width_variable=58)
         escribir_hoja_ancha(writer, vab_ramas, "vabporramas", width_variable=70)
 
 
+# ============================================================
+# SNAPSHOT COLUMNAR (PARQUET)
+# ============================================================
+
+def hoja_a_largo(df: pd.DataFrame, trimestral: bool = False) -> pd.DataFrame:
+    """
+    Pasa una hoja ancha (provincia | variable | períodos...) al formato largo
+    de esquema.py, con el mismo contenido que lee el dashboard desde el Excel.
+
+    La columna `fila` conserva el orden original de la hoja, para poder
+    reconstruir las tablas VAB sin reordenarlas.
+    """
+    columnas_periodos = [c for c in df.columns if c not in ["provincia", "variable"]]
+
+    numeros = {}
+    for c in columnas_periodos:
+        numeros[c] = (numero_trimestral(c) or 0) if trimestral else int(c)
+
+    ancho = df.reset_index(drop=True)
+    ancho["fila"] = ancho.index
+
+    largo = ancho.melt(
+        id_vars=["fila", "provincia", "variable"],
+        value_vars=columnas_periodos,
+        var_name="period",
+        value_name="value",
+    )
+
+    largo["period_num"] = largo["period"].map(numeros)
+    largo["period"] = largo["period"].astype(str)
+    largo["fila"] = largo["fila"].astype("int32")
+
+    return tipar_largo(largo, FRECUENCIA_TRIMESTRAL if trimestral else FRECUENCIA_ANUAL)
+
+
+def exportar_snapshot(hojas: dict[str, pd.DataFrame]) -> None:
+    """
+    Escribe una tabla Parquet por hoja en DIR_SNAPSHOT, más un manifest con
+    el hash del Excel de salida. El dashboard sólo usa el snapshot si ese
+    hash coincide con el Excel que tiene al lado.
+    """
+    DIR_SNAPSHOT.mkdir(parents=True, exist_ok=True)
+
+    for sheet_name, df in hojas.items():
+        largo = hoja_a_largo(df, trimestral=(sheet_name == "trim"))
+        largo.to_parquet(DIR_SNAPSHOT / f"{sheet_name}.parquet", index=False)
+
+    manifest = {
+        "excel": ARCHIVO_SALIDA.name,
+        "sha256": sha256_archivo(ARCHIVO_SALIDA),
+        "esquema": VERSION_ESQUEMA,
+        "hojas": list(hojas.keys()),
+    }
+
+    (DIR_SNAPSHOT / "manifest.json").write_text(
+        json.dumps(manifest, ensure_ascii=False, indent=2),
+        encoding="utf-8",
+    )
+
+
+# ============================================================
+# PIPELINE
+# ============================================================
+
+# fuente -> (función que resuelve la URL, archivo local)
+FUENTES = {
+    "empleo": (url_empleo, ARCHIVO_EMPLEO),
+    "empresas": (url_empresas, ARCHIVO_EMPRESAS),
+    "vab": (lambda: URL_VAB, ARCHIVO_VAB),
+    "expo": (lambda: URL_EXPO, ARCHIVO_EXPO),
+}
+
+# etapa -> (función de lectura, archivo que lee). Son independientes entre sí.
+ETAPAS = {
+    "empleo_trim": (leer_empleo_trim, ARCHIVO_EMPLEO),
+    "empresas_anual": (leer_empresas_anual, ARCHIVO_EMPRESAS),
+    "vab": (leer_vab, ARCHIVO_VAB),
+    "expo_anual": (leer_expo_anual, ARCHIVO_EXPO),
+}
+
+
+# Subir cuando cambie la lógica de algún leer_*: invalida todo el cache de etapas
+VERSION_PARSEO = 2
+
+# etapa -> parámetros de parseo que entran en la clave del cache
+PARAMETROS_ETAPAS = {
+    "empleo_trim": {"filas": FILAS_EMPLEO},
+    "empresas_anual": {"filas": FILAS_EMPRESAS, "anios": ANIOS_EMPRESAS},
+    "vab": {
+        "sectores": SECTORES_FILAS,
+        "ramas": FILAS_RAMAS_INDUSTRIA,
+        "anios": ANIOS_VAB,
+    },
+    "expo_anual": {"variables": MAPA_EXPO_VARIABLES},
+}
+
+
+def descargar_fuentes(max_hilos: int = 4) -> dict[str, bool]:
+    """
+    Resuelve URLs y descarga todas las fuentes en paralelo (es I/O).
+    Devuelve fuente -> si el archivo local cambió.
+    """
+    def _descargar(nombre: str) -> bool:
+        resolver_url, archivo = FUENTES[nombre]
+        return descargar(resolver_url(), archivo)
+
+    with ThreadPoolExecutor(max_workers=max_hilos) as pool:
+        return dict(zip(FUENTES, pool.map(_descargar, FUENTES)))
+
+
+def _correr_etapa(nombre: str) -> tuple[str, object, float]:
+    leer, archivo = ETAPAS[nombre]
+
+    inicio = time.perf_counter()
+    resultado = leer(archivo)
+
+    return nombre, resultado, time.perf_counter() - inicio
+
+
+def clave_etapa(nombre: str) -> dict:
+    """
+    Clave del cache de una etapa: hash del archivo que lee más hash de los
+    parámetros de parseo (filas, años, provincias y VERSION_PARSEO).
+    """
+    _, archivo = ETAPAS[nombre]
+
+    parametros = {
+        "version": VERSION_PARSEO,
+        "provincias": MAPA_PROVINCIAS,
+        "orden_provincias": ORDEN_PROVINCIAS,
+        **PARAMETROS_ETAPAS[nombre],
+    }
+    texto = json.dumps(parametros, ensure_ascii=False, sort_keys=True)
+
+    return {
+        "archivo": archivo.name,
+        "sha256": sha256_archivo(archivo),
+        "parametros": hashlib.sha256(texto.encode("utf-8")).hexdigest(),
+    }
+
+
+def leer_cache_etapa(nombre: str, clave: dict) -> Optional[object]:
+    """
+    Devuelve la salida cacheada de la etapa si su clave coincide, o None.
+    """
+    try:
+        meta = json.loads((DIR_CACHE_ETAPAS / f"{nombre}.json").read_text(encoding="utf-8"))
+
+        if meta.get("clave") != clave:
+            return None
+
+        partes = tuple(
+            pd.read_parquet(DIR_CACHE_ETAPAS / f"{nombre}_{i}.parquet")
+            for i in range(meta["partes"])
+        )
+    except (OSError, ValueError, KeyError):
+        return None
+
+    return partes if meta.get("tupla") else partes[0]
+
+
+def guardar_cache_etapa(nombre: str, clave: dict, resultado: object) -> None:
+    DIR_CACHE_ETAPAS.mkdir(parents=True, exist_ok=True)
+
+    tupla = isinstance(resultado, tuple)
+    partes = resultado if tupla else (resultado,)
+
+    for i, df in enumerate(partes):
+        df.to_parquet(DIR_CACHE_ETAPAS / f"{nombre}_{i}.parquet", index=False)
+
+    # La clave se escribe al final: si algo falla antes, la etapa queda inválida
+    (DIR_CACHE_ETAPAS / f"{nombre}.json").write_text(
+        json.dumps({"clave": clave, "partes": len(partes), "tupla": tupla}, indent=2),
+        encoding="utf-8",
+    )
+
+
+def correr_etapas(
+    paralelo: bool = True,
+    max_procesos: Optional[int] = None,
+    usar_cache: bool = True,
+) -> tuple[dict[str, object], dict[str, float]]:
+    """
+    Corre las etapas de ETAPAS sobre los archivos ya descargados. El
+    parseo de Excel es CPU, así que en paralelo se usa un pool de procesos.
+
+    Con usar_cache=True, una etapa cuyo archivo y parámetros no cambiaron
+    desde la corrida anterior se lee de DIR_CACHE_ETAPAS sin reprocesar.
+
+    Devuelve (etapa -> resultado, etapa -> segundos). Las etapas leídas
+    del cache no aparecen en los tiempos.
+    """
+    resultados = {}
+    tiempos = {}
+    claves = {}
+
+    for nombre in ETAPAS:
+        claves[nombre] = clave_etapa(nombre)
+
+        if usar_cache:
+            cacheado = leer_cache_etapa(nombre, claves[nombre])
+            if cacheado is not None:
+                print(f"Etapa sin cambios, uso cache: {nombre}")
+                resultados[nombre] = cacheado
+
+    pendientes = [n for n in ETAPAS if n not in resultados]
+
+    if paralelo and len(pendientes) > 1:
+        with ProcessPoolExecutor(max_workers=max_procesos) as pool:
+            for nombre, resultado, segundos in pool.map(_correr_etapa, pendientes):
+                resultados[nombre] = resultado
+                tiempos[nombre] = segundos
+    else:
+        for nombre in pendientes:
+            _, resultados[nombre], tiempos[nombre] = _correr_etapa(nombre)
+
+    for nombre in pendientes:
+        guardar_cache_etapa(nombre, claves[nombre], resultados[nombre])
+
+    return {n: resultados[n] for n in ETAPAS}, tiempos
+
+
 # ============================================================
 # MAIN
 # ============================================================
 
-def main() -> None:
-    print("=== Procesando empleo trimestral ===")
-    empleo_trim_largo = procesar_empleo_trim()
-    base_trim = pivotear_trim(empleo_trim_largo)
+def main(paralelo: bool = True, usar_cache: bool = True) -> None:
+    inicio = time.perf_counter()
 
-    print("")
-    print("=== Procesando empresas anuales ===")
-    empresas_largo = procesar_empresas_anual()
+    print("=== Descargando fuentes ===")
+    descargar_fuentes()
 
     print("")
-    print("=== Procesando VAB total ===")
-    vab_total_largo = procesar_vab_total()
+    print("=== Procesando fuentes ===")
+    resultados, tiempos = correr_etapas(paralelo=paralelo, usar_cache=usar_cache)
 
-    print("")
-    print("=== Procesando VAB sectorial y ramas industriales ===")
-    vab_sector_largo, vab_ramas_largo = procesar_vab_sectorial_y_ramas()
+    empleo_trim_largo = resultados["empleo_trim"]
+    empresas_largo = resultados["empresas_anual"]
+    vab_total_largo, vab_sector_largo, vab_ramas_largo = resultados["vab"]
+    expo_largo = resultados["expo_anual"]
 
-    print("")
-    print("=== Procesando exportaciones ===")
-    expo_largo = procesar_expo_anual()
+    base_trim = pivotear_trim(empleo_trim_largo)
 
     print("")
     print("=== Armando hoja anual ===")
@@ -1035,8 +1637,27 @@ def main() -> None:
         vab_ramas=vab_ramas,
     )
 
+    print("")
+    print("=== Exportando snapshot Parquet ===")
+    exportar_snapshot({
+        "anual": base_anual,
+        "trim": base_trim,
+        "vabporsector": vab_sector,
+        "vabporramas": vab_ramas,
+    })
+
     print("")
     print(f"Listo. Archivo creado: {ARCHIVO_SALIDA.resolve()}")
+    print(f"Snapshot: {DIR_SNAPSHOT.resolve()}")
+
+    print("")
+    print("Tiempos por etapa:")
+    for nombre in ETAPAS:
+        if nombre in tiempos:
+            print(f"- {nombre}: {tiempos[nombre]:.1f} s")
+        else:
+            print(f"- {nombre}: sin cambios (cache)")
+    print(f"- total (con descargas y exportación): {time.perf_counter() - inicio:.1f} s")
 
     print("")
     print("Resumen:")
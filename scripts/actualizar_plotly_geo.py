@@ -0,0 +1,68 @@
+# ============================================================
+# Plotly.js para el mapa coroplético del dashboard
+#
+# Descarga el bundle parcial "geo" de plotly.js (sólo trazas
+# geográficas: scattergeo y choropleth) desde el registro de npm
+# y lo deja junto al componente:
+#
+# componentes/mapa_coropletas/plotly-geo.min.js
+#
+# El bundle completo pesa ~4.8 MB; el geo, una fracción. El
+# componente se sirve por la ruta de componentes de Streamlit
+# (sin caché de estáticos), así que cada navegador nuevo lo baja.
+#
+# Para cambiar de versión: actualizar VERSION_PLOTLY_GEO, correr
+# este script y anotar la versión en
+# componentes/mapa_coropletas/README.md.
+# ============================================================
+
+from __future__ import annotations
+
+import hashlib
+import io
+import tarfile
+from pathlib import Path
+
+import requests
+
+
+VERSION_PLOTLY_GEO = "4.1.1"
+
+PAQUETE_NPM = "plotly.js-geo-dist-min"
+ARCHIVO_EN_PAQUETE = "package/plotly-geo.min.js"
+
+DESTINO = Path("componentes") / "mapa_coropletas" / "plotly-geo.min.js"
+
+
+def url_paquete(version: str) -> str:
+    return f"https://registry.npmjs.org/{PAQUETE_NPM}/-/{PAQUETE_NPM}-{version}.tgz"
+
+
+def descargar_bundle(version: str) -> bytes:
+    r = requests.get(url_paquete(version), timeout=120)
+    r.raise_for_status()
+
+    with tarfile.open(fileobj=io.BytesIO(r.content), mode="r:gz") as tgz:
+        miembro = tgz.extractfile(ARCHIVO_EN_PAQUETE)
+
+        if miembro is None:
+            raise ValueError(f"{ARCHIVO_EN_PAQUETE} no está en {PAQUETE_NPM}@{version}")
+
+        return miembro.read()
+
+
+# ============================================================
+# MAIN
+# ============================================================
+
+def main() -> None:
+    contenido = descargar_bundle(VERSION_PLOTLY_GEO)
+
+    DESTINO.write_bytes(contenido)
+
+    print(f"{PAQUETE_NPM}@{VERSION_PLOTLY_GEO}: {DESTINO} ({len(contenido) / 1024:.0f} KB)")
+    print(f"sha256: {hashlib.sha256(contenido).hexdigest()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# ============================================================
+# Precalentamiento del dashboard recién desplegado
+#
+# Paso de deploy: correr después de `streamlit run app.py` (y
+# después de cada actualización de datos).
+#
+# python scripts/precalentar_servidor.py [URL]
+#
+# URL por defecto: http://localhost:8501
+#
+# Streamlit no ejecuta app.py hasta que se abre una sesión, así
+# que sin este paso el primer usuario lanza el precalentamiento y
+# paga las cachés frías. Este script:
+# - espera a que el servidor responda en /_stcore/health,
+# - abre una sesión sin navegador por el websocket de Streamlit
+#   con ?precalentar=1 (app.py espera a que termine precalentar()),
+# - sale cuando esa corrida del script terminó.
+#
+# Usa websockets, que viene con Streamlit (servidor starlette).
+# ============================================================
+
+from __future__ import annotations
+
+import asyncio
+import sys
+import time
+
+import requests
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+
+URL_DEFECTO = "http://localhost:8501"
+
+ESPERA_SERVIDOR_S = 120
+ESPERA_SCRIPT_S = 600
+
+
+def esperar_servidor(url: str, espera_s: float = ESPERA_SERVIDOR_S) -> None:
+    limite = time.monotonic() + espera_s
+
+    while True:
+        try:
+            if requests.get(f"{url}/_stcore/health", timeout=5).ok:
+                return
+        except requests.RequestException:
+            pass
+
+        if time.monotonic() > limite:
+            raise TimeoutError(f"El servidor no respondió en {espera_s:.0f} s: {url}")
+
+        time.sleep(1)
+
+
+async def correr_sesion(url: str, espera_s: float = ESPERA_SCRIPT_S) -> None:
+    """
+    Abre una sesión, pide una corrida de app.py con ?precalentar=1 y
+    espera el mensaje de fin de script.
+    """
+    url_ws = url.replace("http://", "ws://", 1).replace("https://", "wss://", 1)
+
+    async with websockets.connect(
+        f"{url_ws}/_stcore/stream",
+        subprotocols=["streamlit"],
+        max_size=None,
+    ) as ws:
+        pedido = BackMsg()
+        pedido.rerun_script.query_string = "precalentar=1"
+        pedido.rerun_script.page_script_hash = ""
+        await ws.send(pedido.SerializeToString())
+
+        while True:
+            msg = ForwardMsg()
+            msg.ParseFromString(await asyncio.wait_for(ws.recv(), espera_s))
+
+            if msg.WhichOneof("type") == "script_finished":
+                return
+
+
+# ============================================================
+# MAIN
+# ============================================================
+
+def main() -> None:
+    url = (sys.argv[1] if len(sys.argv) > 1 else URL_DEFECTO).rstrip("/")
+
+    print(f"Esperando al servidor: {url}")
+    esperar_servidor(url)
+
+    inicio = time.perf_counter()
+    asyncio.run(correr_sesion(url))
+
+    print(f"Precalentado en {time.perf_counter() - inicio:.1f} s (detalle en el log del servidor)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+# ============================================================
+# Geometría simplificada para los mapas del dashboard
+#
+# Entrada:
+# data/provincias_ign.geojson (resolución completa, ~600 KB)
+#
+# Salida (una por tolerancia):
+# data/provincias_ign_s005.geojson   -> tolerancia 0.005°
+# data/provincias_ign_s010.geojson   -> tolerancia 0.010°
+# data/provincias_ign_s020.geojson   -> tolerancia 0.020°
+#
+# Cada variante:
+# - simplifica cada anillo con Douglas-Peucker,
+# - cuantiza las coordenadas a una grilla acorde a la tolerancia,
+# - descarta islas más chicas que la tolerancia,
+# - conserva sólo las propiedades que usa el mapa (id, nombre).
+#
+# El dashboard elige la variante más liviana cuya tolerancia
+# queda por debajo de medio píxel del mapa (700 px de alto).
+# ============================================================
+
+from __future__ import annotations
+
+import json
+import math
+from pathlib import Path
+
+
+ARCHIVO_GEO = Path("data") / "provincias_ign.geojson"
+
+# tolerancia en grados -> sufijo del archivo
+TOLERANCIAS = {
+    0.005: "s005",
+    0.010: "s010",
+    0.020: "s020",
+}
+
+PROPIEDADES_MAPA = ["id", "nombre"]
+
+
+# ============================================================
+# SIMPLIFICACIÓN
+# ============================================================
+
+def _distancia_segmento(p: list[float], a: list[float], b: list[float]) -> float:
+    ax, ay = a
+    bx, by = b
+    px, py = p
+
+    dx, dy = bx - ax, by - ay
+    largo2 = dx * dx + dy * dy
+
+    if largo2 == 0:
+        return math.hypot(px - ax, py - ay)
+
+    t = max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / largo2))
+
+    return math.hypot(px - (ax + t * dx), py - (ay + t * dy))
+
+
+def douglas_peucker(puntos: list[list[float]], tolerancia: float) -> list[list[float]]:
+    """
+    Douglas-Peucker iterativo (sin recursión, los anillos tienen miles de puntos).
+    Conserva siempre el primer y el último punto.
+    """
+    if len(puntos) < 3:
+        return puntos
+
+    conservar = [False] * len(puntos)
+    conservar[0] = conservar[-1] = True
+    pila = [(0, len(puntos) - 1)]
+
+    while pila:
+        ini, fin = pila.pop()
+
+        max_d = 0.0
+        max_i = None
+
+        for i in range(ini + 1, fin):
+            d = _distancia_segmento(puntos[i], puntos[ini], puntos[fin])
+            if d > max_d:
+                max_d = d
+                max_i = i
+
+        if max_i is not None and max_d > tolerancia:
+            conservar[max_i] = True
+            pila.append((ini, max_i))
+            pila.append((max_i, fin))
+
+    return [p for p, c in zip(puntos, conservar) if c]
+
+
+def _area(anillo: list[list[float]]) -> float:
+    return abs(sum(
+        x0 * y1 - x1 * y0
+        for (x0, y0), (x1, y1) in zip(anillo, anillo[1:])
+    )) / 2
+
+
+def simplificar_anillo(
+    anillo: list[list[float]],
+    tolerancia: float,
+    decimales: int,
+) -> list[list[float]] | None:
+    """
+    Simplifica y cuantiza un anillo cerrado. Devuelve None si el anillo
+    colapsa (menos de 4 puntos o área menor que (2 * tolerancia)²).
+    """
+    # Se parte el anillo en dos mitades para que el primer punto
+    # no quede fijo como único extremo de la simplificación.
+    medio = len(anillo) // 2
+    simple = (
+        douglas_peucker(anillo[: medio + 1], tolerancia)[:-1]
+        + douglas_peucker(anillo[medio:], tolerancia)
+    )
+
+    cuantizado = []
+    for x, y in simple:
+        p = [round(x, decimales), round(y, decimales)]
+        if not cuantizado or cuantizado[-1] != p:
+            cuantizado.append(p)
+
+    if cuantizado[0] != cuantizado[-1]:
+        cuantizado.append(cuantizado[0])
+
+    if len(cuantizado) < 4 or _area(cuantizado) < (2 * tolerancia) ** 2:
+        return None
+
+    return cuantizado
+
+
+def simplificar_poligono(
+    poligono: list[list[list[float]]],
+    tolerancia: float,
+    decimales: int,
+) -> list[list[list[float]]] | None:
+    exterior = simplificar_anillo(poligono[0], tolerancia, decimales)
+
+    if exterior is None:
+        return None
+
+    huecos = [simplificar_anillo(h, tolerancia, decimales) for h in poligono[1:]]
+
+    return [exterior] + [h for h in huecos if h is not None]
+
+
+def simplificar_geometria(geometria: dict, tolerancia: float, decimales: int) -> dict:
+    if geometria["type"] == "Polygon":
+        poligonos = [geometria["coordinates"]]
+    else:
+        poligonos = geometria["coordinates"]
+
+    simples = [simplificar_poligono(p, tolerancia, decimales) for p in poligonos]
+    simples = [p for p in simples if p is not None]
+
+    # Nunca se pierde una provincia entera: si todo colapsó,
+    # se conserva el polígono más grande sin simplificar.
+    if not simples:
+        mayor = max(poligonos, key=lambda p: _area(p[0]))
+        simples = [[[[round(x, decimales), round(y, decimales)] for x, y in a] for a in mayor]]
+
+    if len(simples) == 1:
+        return {"type": "Polygon", "coordinates": simples[0]}
+
+    return {"type": "MultiPolygon", "coordinates": simples}
+
+
+def decimales_para(tolerancia: float) -> int:
+    # Grilla de cuantización ~10 veces más fina que la tolerancia
+    return max(0, math.ceil(-math.log10(tolerancia))) + 1
+
+
+def simplificar_geojson(geo: dict, tolerancia: float) -> dict:
+    decimales = decimales_para(tolerancia)
+    features = []
+
+    for f in geo.get("features", []):
+        props = f.get("properties", {})
+
+        features.append({
+            "type": "Feature",
+            "properties": {k: props[k] for k in PROPIEDADES_MAPA if k in props},
+            "geometry": simplificar_geometria(f["geometry"], tolerancia, decimales),
+        })
+
+    return {
+        "type": "FeatureCollection",
+        "features": features,
+    }
+
+
+# ============================================================
+# MAIN
+# ============================================================
+
+def ruta_variante(sufijo: str) -> Path:
+    return ARCHIVO_GEO.with_name(f"{ARCHIVO_GEO.stem}_{sufijo}.geojson")
+
+
+def main() -> None:
+    with open(ARCHIVO_GEO, encoding="utf-8") as f:
+        geo = json.load(f)
+
+    print(f"Original: {ARCHIVO_GEO} ({ARCHIVO_GEO.stat().st_size / 1024:.0f} KB)")
+
+    for tolerancia, sufijo in TOLERANCIAS.items():
+        simple = simplificar_geojson(geo, tolerancia)
+        destino = ruta_variante(sufijo)
+
+        destino.write_text(
+            json.dumps(simple, ensure_ascii=False, separators=(",", ":")),
+            encoding="utf-8",
+        )
+
+        print(f"- tolerancia {tolerancia}: {destino} ({destino.stat().st_size / 1024:.0f} KB)")
+
+
+if __name__ == "__main__":
+    main()